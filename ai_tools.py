@@ -1,3 +1,5 @@
+import random
+
 from constants import *
 from utilities import *
 
@@ -89,4 +91,262 @@ def get_explore_spot(x,y,shots):
         y2=y+yoffset
         if is_inside_board(x2,y2) and not shots[x2][y2]:
             return x2, y2
-    return None
\ No newline at end of file
+    return None
+
+"Each live hit a placement covers multiplies its weight by this much, since it likely belongs to a ship there."
+LIVE_HIT_WEIGHT = 30
+
+"Cell indexes sharing an edge with each cell index, x*BOARD.HEIGHT+y."
+CELL_NEIGHBOURS = [[x2 * BOARD.HEIGHT + y2
+                    for x2, y2 in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)) if is_inside_board(x2, y2)]
+                   for x in range(BOARD.WIDTH) for y in range(BOARD.HEIGHT)]
+
+
+class DensityMap:
+    """Counts, for every cell, the placements of the unsunk ships that are still possible.
+    Pass it the hits and shots from get_move each turn, and it only works through the new shots:
+
+        def __init__(self):
+            self.density_map = ai_tools.DensityMap()
+
+        def get_move(self, hits, shots):
+            self.density_map.update(hits, shots)
+            return self.density_map.get_best_move()
+
+    A placement stops being possible when it covers a miss, touches a hit it does not cover, or
+    covers or touches a sunk ship, since ships never touch. When a shot sinks a ship, the hits
+    connected to it are that ship, so its length is taken off the ships still to find.
+    Placements covering live hits, hits on ships that are not sunk yet, count for more.
+    When the shots go back to empty, a new game has started and the map resets itself."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        cell_count = BOARD.WIDTH * BOARD.HEIGHT
+        self.shots_columns = [(0,) * BOARD.HEIGHT for x in range(BOARD.WIDTH)]
+        self.shot_cells = [False] * cell_count
+        self.hit_cells = set()
+        self.live_hits = set()
+
+        "How many ships of each length are not sunk yet."
+        self.remaining = {}
+        for ship_length in BOARD.SHIP_LENGTHS:
+            self.remaining[ship_length] = self.remaining.get(ship_length, 0) + 1
+
+        self.index = get_placement_index()
+
+        "Per ship length, the weight of every possible placement, and the total weight covering each cell."
+        self.weights = {}
+        self.densities = {}
+        for ship_length in self.remaining:
+            self.weights[ship_length] = dict.fromkeys(self.index.by_length[ship_length], 1)
+            density = [0] * cell_count
+            for placement in self.index.by_length[ship_length]:
+                for cell in placement.cells:
+                    density[cell] += 1
+            self.densities[ship_length] = density
+
+        "Densities summed over every ship still to find, counting lengths once per ship."
+        self.totals = [0] * cell_count
+        for ship_length, count in self.remaining.items():
+            for cell in range(cell_count):
+                self.totals[cell] += count * self.densities[ship_length][cell]
+
+    def update(self, hits, shots):
+        "Catches up with every shot that is new since the last update."
+        new_shots = []
+        sinking_shots = []
+        for x in range(BOARD.WIDTH):
+            column = shots[x]
+            if column == self.shots_columns[x]:
+                continue
+            for y in range(BOARD.HEIGHT):
+                if column[y] == self.shots_columns[x][y]:
+                    continue
+                if not column[y]:
+                    "A shot has gone, so this is a new game."
+                    self.reset()
+                    return self.update(hits, shots)
+                new_shots.append((x * BOARD.HEIGHT + y, hits[x][y]))
+            self.shots_columns[x] = column
+
+        for cell, hit in new_shots:
+            self.shot_cells[cell] = True
+            if hit:
+                self.add_hit(cell)
+            else:
+                self.remove_placements(self.index.by_cell[cell])
+        for cell, hit in new_shots:
+            if hit == 2:
+                self.sink(cell)
+
+    def add_hit(self, cell):
+        self.hit_cells.add(cell)
+        self.live_hits.add(cell)
+        self.remove_placements(self.index.touching_cell[cell])
+        for placement in self.index.by_cell[cell]:
+            weights = self.weights.get(placement.ship[0])
+            if weights and placement in weights:
+                self.change_weight(placement, weights[placement] * (LIVE_HIT_WEIGHT - 1))
+
+    def sink(self, cell):
+        "Removes the ship sunk by the shot at this cell: every hit connected to it."
+        ship_cells = {cell}
+        unvisited = [cell]
+        while unvisited:
+            for neighbour in CELL_NEIGHBOURS[unvisited.pop()]:
+                if neighbour in self.hit_cells and neighbour not in ship_cells:
+                    ship_cells.add(neighbour)
+                    unvisited.append(neighbour)
+
+        self.live_hits -= ship_cells
+        for ship_cell in ship_cells:
+            self.remove_placements(self.index.by_cell[ship_cell])
+            for neighbour in CELL_NEIGHBOURS[ship_cell]:
+                self.remove_placements(self.index.by_cell[neighbour])
+
+        ship_length = len(ship_cells)
+        if self.remaining.get(ship_length):
+            self.remaining[ship_length] -= 1
+            density = self.densities[ship_length]
+            for i in range(len(self.totals)):
+                self.totals[i] -= density[i]
+            if not self.remaining[ship_length]:
+                del self.weights[ship_length]
+                del self.densities[ship_length]
+
+    def change_weight(self, placement, change):
+        ship_length = placement.ship[0]
+        self.weights[ship_length][placement] += change
+        density = self.densities[ship_length]
+        total_change = change * self.remaining[ship_length]
+        for cell in placement.cells:
+            density[cell] += change
+            self.totals[cell] += total_change
+
+    def remove_placements(self, placements):
+        for placement in placements:
+            weights = self.weights.get(placement.ship[0])
+            if weights and placement in weights:
+                self.change_weight(placement, -weights[placement])
+                del weights[placement]
+
+    def get_density(self, x, y):
+        "Returns the total weight of possible placements covering this cell."
+        return self.totals[x * BOARD.HEIGHT + y]
+
+    def get_best_move(self):
+        "Returns the unshot cell (x,y) with the highest density, or None if every cell has been shot."
+        best_cell = None
+        best_density = -1
+        for cell, density in enumerate(self.totals):
+            if density > best_density and not self.shot_cells[cell]:
+                best_cell = cell
+                best_density = density
+        if best_cell is None:
+            return None
+        return best_cell // BOARD.HEIGHT, best_cell % BOARD.HEIGHT
+
+
+"Tries at drawing a placement that fits before a biased FleetGenerator lists every one that does."
+FLEET_DRAW_TRIES = 20
+
+
+class FleetGenerator:
+    """Draws random legal fleets for get_setup: one ship for each of BOARD.SHIP_LENGTHS, not overlapping or touching,
+    and clear of the cut off corners, so they pass both World.set_ships and are_ships_valid.
+
+        def get_setup(self):
+            return ai_tools.get_random_fleet()
+
+    Every legal fleet is equally likely. This is rejection sampling: ships are drawn longest first, each uniformly
+    from all its placements in the placement index, and the fleet is drawn again from the start as soon as a ship
+    overlaps or touches an earlier one. About 1 fleet in 25 is kept, but most tries fail by the second or third ship,
+    so it still gives tens of thousands of fleets a second.
+
+    With biased, a ship that doesn't fit is drawn again from the placements that do, so fleets are rarely thrown
+    away, and it runs six to seven times faster. It is not uniform: fleets whose later ships had fewer places to go
+    are more likely, so ships land in the middle of the board up to about 11% more often than they should, and
+    on the outer rows and columns about 16% less often. Only use it where that doesn't matter, like stress tests.
+
+    Either way it uses the global random module unless given a random.Random, so Game's seed makes the fleets
+    repeatable."""
+
+    def __init__(self, rng=None, biased=False):
+        self.random = (rng or random).random
+        self.biased = biased
+        index = get_placement_index()
+
+        "For each ship, longest first, (mask, mask of cells it blocks, ship) for every placement inside the world."
+        self.choices = []
+        for ship_length in sorted(BOARD.SHIP_LENGTHS, reverse=True):
+            self.choices.append([(placement.mask, placement.mask | placement.neighbour_mask, placement.ship)
+                                 for placement in index.by_length[ship_length] if placement.is_in_world])
+
+    def get_fleet(self):
+        "Returns a list of (length, x, y, vertical) ships."
+        if self.biased:
+            return self.get_biased_fleet()
+        random = self.random
+        while True:
+            blocked = 0
+            fleet = []
+            for choices in self.choices:
+                mask, blocked_mask, ship = choices[int(random() * len(choices))]
+                if mask & blocked:
+                    break
+                blocked |= blocked_mask
+                fleet.append(ship)
+            else:
+                return fleet
+
+    def get_biased_fleet(self):
+        random = self.random
+        while True:
+            blocked = 0
+            fleet = []
+            for choices in self.choices:
+                "The first draw is tried here, since it usually fits."
+                mask, blocked_mask, ship = choice = choices[int(random() * len(choices))]
+                if mask & blocked:
+                    choice = self.draw(choices, blocked)
+                    if choice is None:
+                        break
+                    mask, blocked_mask, ship = choice
+                blocked |= blocked_mask
+                fleet.append(ship)
+            else:
+                return fleet
+
+    def draw(self, choices, blocked):
+        """Returns a random choice whose ship does not cover a blocked cell, or None if there isn't one.
+        A few more draws are tried before listing every choice that fits."""
+        for attempt in range(FLEET_DRAW_TRIES):
+            choice = choices[int(self.random() * len(choices))]
+            if not choice[0] & blocked:
+                return choice
+        choices = [choice for choice in choices if not choice[0] & blocked]
+        if not choices:
+            "Earlier ships left no room for this one. This is very rare on the standard board."
+            return None
+        return choices[int(self.random() * len(choices))]
+
+    def iter_fleets(self, count=None):
+        "Yields count fleets, or fleets forever if count is None, for building collections of fleets."
+        generated = 0
+        while count is None or generated < count:
+            yield self.get_fleet()
+            generated += 1
+
+
+_fleet_generator = None
+
+
+def get_random_fleet():
+    """Returns a random legal fleet using the global random module. Every legal fleet is equally likely,
+    so opponents can't learn where ships are more likely to be."""
+    global _fleet_generator
+    if _fleet_generator is None:
+        _fleet_generator = FleetGenerator()
+    return _fleet_generator.get_fleet()
@@ -0,0 +1,166 @@
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from constants import *
+from utilities import *
+from world import World
+
+"""This module plays many games between the same two bots at once, using NumPy.
+
+Boards for all games are stacked into (games, BOARD.WIDTH, BOARD.HEIGHT) arrays, and every turn
+applies one shot per game, then works out hits, sinks and finished games in bulk. The rules match
+Game.play: game seeds come from get_game_seed, so each game's ship setups and first mover are
+the same as Game would pick for that seed, bad setups, crashes and out of bounds moves lose,
+and games longer than max_turns are draws.
+
+Bots may add a batched move method:
+
+    def get_moves(self, hits_batch, shots_batch):
+        "hits_batch and shots_batch are (games, BOARD.WIDTH, BOARD.HEIGHT) arrays, one board per game."
+        return moves  # a (games, 2) integer array of x,y
+
+Bots without it are asked for each game's move with get_move, which is much slower.
+NumPy is only needed for this module, the rest of the game runs without it."""
+
+
+class BatchResult:
+    "Outcomes of a batch of games, as NumPy arrays with one entry per game."
+    def __init__(self, outcomes, turns, first_players, seeds):
+        self.outcomes = outcomes
+        self.turns = turns
+        self.first_players = first_players
+        self.seeds = seeds
+
+    def get_counts(self):
+        "Returns (player 1 wins, player 2 wins, draws)."
+        player1_wins = int((self.outcomes == OUTCOMES.PLAYER1_WIN).sum())
+        player2_wins = int((self.outcomes == OUTCOMES.PLAYER2_WIN).sum())
+        return player1_wins, player2_wins, len(self.outcomes) - player1_wins - player2_wins
+
+
+def get_setup_grid(bot, grids):
+    """Returns the ship id grid for the bot's setup, or None if the setup crashed or is invalid.
+    Most bots reuse a few fleets, so grids caches each checked fleet."""
+    try:
+        ships = bot.get_setup()
+        key = tuple([tuple(ship) for ship in ships])
+        if key not in grids:
+            world = World(BOARD.WIDTH, BOARD.HEIGHT)
+            grids[key] = world.ships if world.set_ships(ships) else None
+        return grids[key]
+    except:
+        return None
+
+
+def get_moves(bot, hits_batch, shots_batch):
+    """Asks a bot for one move per board. Returns a (games, 2) array of moves and a boolean array
+    of games where the bot crashed or made an invalid move."""
+    game_count = len(hits_batch)
+    try:
+        if hasattr(bot, "get_moves"):
+            moves = numpy.asarray(bot.get_moves(hits_batch, shots_batch))
+            assert moves.shape == (game_count, 2)
+            assert numpy.issubdtype(moves.dtype, numpy.integer)
+            crashed = numpy.zeros(game_count, dtype=bool)
+        else:
+            moves = numpy.zeros((game_count, 2), dtype=numpy.int64)
+            crashed = numpy.zeros(game_count, dtype=bool)
+            for k in range(game_count):
+                try:
+                    hits = tuple([tuple(column) for column in hits_batch[k].tolist()])
+                    shots = tuple([tuple(column) for column in shots_batch[k].tolist()])
+                    x, y = bot.get_move(hits=hits, shots=shots)
+                    assert type(x) is int
+                    assert type(y) is int
+                    moves[k] = x, y
+                except:
+                    crashed[k] = True
+    except:
+        return numpy.zeros((game_count, 2), dtype=numpy.int64), numpy.ones(game_count, dtype=bool)
+
+    crashed |= (moves[:, 0] < 0) | (moves[:, 0] >= BOARD.WIDTH) | (moves[:, 1] < 0) | (moves[:, 1] >= BOARD.HEIGHT)
+    "Crashed moves are replaced in a new array, since moves may be the array the bot returned and still holds."
+    moves = numpy.where(crashed[:, None], 0, moves)
+    return moves, crashed
+
+
+def play_batch(bot1, bot2, game_count, max_turns=1000, master_seed=0, first_index=0):
+    "Plays game_count games between bot1 and bot2, using the seeds for game indexes from first_index on."
+    if numpy is None:
+        raise ImportError("The batch engine needs NumPy. Install it with: pip install numpy")
+
+    bots = (bot1, bot2)
+    size = (game_count, BOARD.WIDTH, BOARD.HEIGHT)
+    ships = numpy.zeros((2,) + size, dtype=numpy.int8)
+    shots = numpy.zeros((2,) + size, dtype=numpy.int8)
+    hits = numpy.zeros((2,) + size, dtype=numpy.int8)
+    health = numpy.zeros((2, game_count, BOARD.SHIP_COUNT + 1), dtype=numpy.int16)
+    remaining = numpy.zeros((2, game_count), dtype=numpy.int16)
+
+    outcomes = numpy.full(game_count, OUTCOMES.IN_PROGRESS, dtype=numpy.int8)
+    turns = numpy.zeros(game_count, dtype=numpy.int32)
+    first_players = numpy.full(game_count, -1, dtype=numpy.int8)
+    seeds = [get_game_seed(master_seed, first_index + i) for i in range(game_count)]
+
+    "Setups run game by game, seeded the same way as Game.play so they match it."
+    grids = {}
+    for i, seed in enumerate(seeds):
+        random.seed(get_sub_seed(seed, "bots"))
+        for player in range(2):
+            set_game_seed(bots[player], player, seed)
+            grid = get_setup_grid(bots[player], grids)
+            if grid is None:
+                outcomes[i] = OUTCOMES.PLAYER2_WIN if player == 0 else OUTCOMES.PLAYER1_WIN
+                break
+            ships[player, i] = grid
+        else:
+            first_players[i] = random.Random(get_sub_seed(seed, "first")).randint(0, 1)
+
+    for player in range(2):
+        for ship_id in range(1, BOARD.SHIP_COUNT + 1):
+            health[player, :, ship_id] = (ships[player] == ship_id).sum(axis=(1, 2))
+        remaining[player] = health[player].sum(axis=1)
+
+    for turn in range(1, max_turns + 2):
+        active = outcomes == OUTCOMES.IN_PROGRESS
+        if not active.any():
+            break
+        turns[active] = turn
+        if turn > max_turns:
+            outcomes[active] = OUTCOMES.DRAW
+            break
+
+        "The first mover shoots on odd turns."
+        movers = numpy.where(turn % 2 == 1, first_players, 1 - first_players)
+        for player in range(2):
+            games = numpy.nonzero(active & (movers == player))[0]
+            if not len(games):
+                continue
+            target = 1 - player
+            loss = OUTCOMES.PLAYER2_WIN if player == 0 else OUTCOMES.PLAYER1_WIN
+            win = OUTCOMES.PLAYER1_WIN if player == 0 else OUTCOMES.PLAYER2_WIN
+
+            moves, crashed = get_moves(bots[player], hits[target, games], shots[target, games])
+            outcomes[games[crashed]] = loss
+            games = games[~crashed]
+            xs = moves[~crashed, 0]
+            ys = moves[~crashed, 1]
+
+            new_shot = shots[target, games, xs, ys] == 0
+            shots[target, games, xs, ys] = 1
+            ship_ids = ships[target, games, xs, ys]
+            hit = new_shot & (ship_ids > 0)
+            games, xs, ys, ship_ids = games[hit], xs[hit], ys[hit], ship_ids[hit]
+
+            hits[target, games, xs, ys] = 1
+            health[target, games, ship_ids] -= 1
+            remaining[target, games] -= 1
+            sunk = health[target, games, ship_ids] == 0
+            hits[target, games[sunk], xs[sunk], ys[sunk]] = 2
+            outcomes[games[remaining[target, games] == 0]] = win
+
+    return BatchResult(outcomes, turns, first_players, seeds)
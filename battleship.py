@@ -6,7 +6,9 @@ Usage:
   battleship.py test
   battleship.py robin <bots-folder> [options]
   battleship.py benchmark <bots-folder> [options]
-  battleship.py heatmap <log-folder>
+  battleship.py heatmap <log-folder> [options]
+  battleship.py replay <record-path> [options]
+  battleship.py perf [options]
 
 Options:
   --rounds=<count>            Play this many rounds for 'match', 'robin', or 'benchmark' mode. [default: 1]
@@ -14,83 +16,238 @@ Options:
   --verbose
   --wait=<seconds>            Wait this many seconds between turns. Useful for viewing. [default: 0]
   --logging                   Write log files for every game to the 'logs' folder.
+  --log-format=<format>       'binary' appends compact game records to one file per run, 'text' writes a log per game. [default: binary]
+  --game=<number>             Show the full log of this game from a 'replay' record file.
+  --bitboard                  Use the bitmask World backend instead of nested lists.
+  --workers=<count>           Spread games across this many processes. Ignores --verbose and --wait. [default: 1]
+  --seed=<seed>               Master seed. Game seeds are derived from it, so runs can be repeated exactly.
+  --batch=<games>             Play 'match' rounds with the NumPy batch engine, this many games at a time. No logs, results or time limits.
+  --game-seed=<seed>          Replay the single 'match' game that used this game seed, as shown in its log.
+  --move-time=<seconds>       A bot that takes longer than this for a move loses the game.
+  --setup-time=<seconds>      A bot that takes longer than this for its ship setup loses the game.
+  --sandbox                   Run each bot in its own process with CPU and memory limits. Slow bots are stopped at the time limits.
+  --profile-startup           Run the command, then report how long the interpreter and each import took to start it.
+  --results=<path>            Append one JSON line per game to this file for 'match', 'robin' or 'benchmark', as games finish.
+  --profile                   Write cProfile stats for the command to the 'profiles' folder, and show each bot's time in every game phase.
+  --output=<path>             Also write the 'perf' results to this JSON file, to use as a baseline later.
+  --baseline=<path>           Compare the 'perf' results with a JSON file written by an earlier run.
+  --tolerance=<percent>       A 'perf' benchmark this much slower than the baseline is a regression. [default: 10]
   
   -h --help           Show this screen.
   -v --version        Show version.
 """
 
 import os.path
-import unittest
-import sys, json
-from itertools import combinations
-from collections import Counter
+import sys
+import random
+import time
+from array import array
 
-from docopt import docopt
 from game import Game
 from utilities import *
+from world import World
 
+"""Modules only some commands need, like docopt, unittest, json, BitWorld, the latency and phase profiles,
+the worker pool, logging and records, are imported inside the functions that use them, so short runs like 'match' start faster."""
+
+
+def get_sandbox_loader(sandbox_options,loaded_bots):
+    """Returns a loader for is_valid_script that builds sandboxed bots, or None to load bots in this process.
+    Sandboxed bots it builds are kept in the loaded_bots dictionary by path, so get_folder_bots can reuse them."""
+    if sandbox_options is None:
+        return None
+    def load(path):
+        bot=get_bot(path,sandbox_options)
+        loaded_bots[path]=bot
+        return bot
+    "Scripts that passed in this process must still be checked once in the sandbox."
+    load.cache_kind="sandbox"
+    return load
+
+def get_folder_bots(bots_folder,verbose,sandbox_options):
+    """Returns the paths of the valid bot scripts in bots_folder, and a bot for each.
+    Each script is checked once, and a sandboxed bot started to check a script is the one that plays."""
+    loaded_bots={}
+    loader=get_sandbox_loader(sandbox_options,loaded_bots)
+    paths=[]
+    bots=[]
+    for path in get_bot_paths(bots_folder,verbose=verbose,loader=loader):
+        if path in loaded_bots:
+            bot=loaded_bots.pop(path)
+        else:
+            "A script found in the validation cache was not loaded to check it, and can still fail."
+            try:
+                bot=get_bot(path,sandbox_options)
+                assert bot is not None
+            except:
+                print("Script failed to import: '%s'"%path)
+                import traceback
+                traceback.print_exc(limit=2,file=sys.stdout)
+                forget_valid_script(path,loader)
+                continue
+        paths.append(path)
+        bots.append(bot)
+    "Bots started for scripts that failed their checks."
+    for bot in loaded_bots.values():
+        bot.close()
+    return paths,bots
+
+def get_match_bot(path,sandbox_options):
+    "Returns the bot at path, or None if it fails to load, in this process or in a sandbox."
+    try:
+        return get_bot(path,sandbox_options)
+    except Exception as error:
+        print("Bot failed to load: '%s'\n%s"%(path,error))
+        return None
+
+def get_results_writer(results_path):
+    "Returns a ResultsWriter for results_path, or None if there is no path."
+    if not results_path:
+        return None
+    from results import ResultsWriter
+    return ResultsWriter(results_path)
+
+def close_results_writer(results_writer):
+    "Closes the results file, if any, and prints the running totals it kept."
+    if results_writer:
+        results_writer.close()
+        print("Results written to '%s':"%results_writer.path)
+        for line in results_writer.summary.get_lines():
+            print("  "+line)
+
+def get_logger(log_format,label,versus=True):
+    from logwriter import GameLogger
+    return GameLogger(log_format,label,versus=versus)
+
+def print_phase_tables(bots,profiles):
+    for bot,profile in zip(bots,profiles):
+        print("Phase times for '%s':"%get_ship_name(bot))
+        for line in profile.get_table():
+            print("  "+line)
 
 def run_unit_tests():
+    import unittest
     paths = get_matching_paths_recursively("tests", ".py")
     modules = [path[:-3].replace(os.sep, ".") for path in paths]
     suites = [unittest.defaultTestLoader.loadTestsFromName(m) for m in modules]
     test_suite = unittest.TestSuite(suites)
     text_runner = unittest.TextTestRunner().run(test_suite)
 
-def run_match(bot1path,bot2path,rounds,wait_seconds,max_turns,logging,verbose):
-    bot1 = get_bot_from_path(bot1path, verbose=verbose)
-    bot2 = get_bot_from_path(bot2path, verbose=verbose)
+def run_match(bot1path,bot2path,rounds,wait_seconds,max_turns,logging,verbose,world_class=World,workers=1,master_seed=0,game_seed=None,log_format=LOG_FORMAT.BINARY,batch_size=0,
+              move_time=None,setup_time=None,sandbox_options=None,profile=False,results_path=None):
+    """Plays rounds games between two bots. If game_seed is given, plays just that one game.
+    With profile, prints each bot's time in every game phase. With results_path, appends a JSON line per game there."""
+    bot1 = get_match_bot(bot1path, sandbox_options)
+    bot2 = get_match_bot(bot2path, sandbox_options)
+    if game_seed is not None:
+        rounds=1
+        workers=1
+        batch_size=0
     if bot1 and bot2:
+        logger=get_logger(log_format,"game",versus=False) if logging else None
         bot1_wins_this_match=0
         bot2_wins_this_match=0
         draws=0
-        for round_number in range(rounds):
-            game = Game(bot1, bot2, verbose=verbose, wait_seconds=wait_seconds, max_turns=max_turns)
-            if logging:
-                game.write_log()
-                
-            if game.outcome == OUTCOMES.PLAYER1_WIN:
-                bot1_wins_this_match+=1
-            elif game.outcome == OUTCOMES.PLAYER2_WIN:
-                bot2_wins_this_match+=1
-            else:
-                draws+=1
+        from latency import LatencyHistogram
+        from profiling import PhaseProfile
+        latencies=[LatencyHistogram(),LatencyHistogram()]
+        profiles=[PhaseProfile(),PhaseProfile()]
+        results_writer=None if batch_size else get_results_writer(results_path)
+        if results_writer:
+            from results import get_game_row
+        if batch_size:
+            "numpy is slow to import, so only load the batch engine when it is used."
+            from batch import play_batch
+            for first_index in range(0,rounds,batch_size):
+                result=play_batch(bot1,bot2,min(batch_size,rounds-first_index),max_turns=max_turns,
+                                  master_seed=master_seed,first_index=first_index)
+                batch_bot1_wins,batch_bot2_wins,batch_draws=result.get_counts()
+                bot1_wins_this_match+=batch_bot1_wins
+                bot2_wins_this_match+=batch_bot2_wins
+                draws+=batch_draws
+        elif workers>1:
+            from tournament import play_pairings_parallel
+            game_options=dict(verbose=False, wait_seconds=0, max_turns=max_turns, world_class=world_class,
+                              move_time=move_time, setup_time=setup_time)
+            bot1_wins_this_match,bot2_wins_this_match,draws=play_pairings_parallel(
+                [bot1path,bot2path],[(0,1)],rounds,game_options,logger,master_seed,workers,latencies,sandbox_options,profiles,
+                results_writer)[0]
+        else:
+            for round_number in range(rounds):
+                seed = game_seed if game_seed is not None else get_game_seed(master_seed,round_number)
+                game = Game(bot1, bot2, verbose=verbose, wait_seconds=wait_seconds, max_turns=max_turns, world_class=world_class, seed=seed,
+                            move_time=move_time, setup_time=setup_time)
+                if logger:
+                    logger.write(game)
+                for player in range(2):
+                    latencies[player].merge(game.move_latencies[player])
+                    profiles[player].merge(game.phase_profiles[player])
+                if results_writer:
+                    results_writer.append(get_game_row(game,round_number if game_seed is None else None,(bot1path,bot2path)))
+                    
+                if game.outcome == OUTCOMES.PLAYER1_WIN:
+                    bot1_wins_this_match+=1
+                elif game.outcome == OUTCOMES.PLAYER2_WIN:
+                    bot2_wins_this_match+=1
+                else:
+                    draws+=1
+        if logger:
+            logger.close()
             
         print("\nBattleship computed %s game%s."%(rounds,"" if rounds==1 else "s"))
-        print(game.get_ship_name(bot1)+" won %s/%s rounds."%(bot1_wins_this_match,rounds))
-        print(game.get_ship_name(bot2)+" won %s/%s rounds."%(bot2_wins_this_match,rounds))
+        if game_seed is not None:
+            print("Game seed: %s"%game_seed)
+        else:
+            print("Master seed: %s"%master_seed)
+        print(get_ship_name(bot1)+" won %s/%s rounds."%(bot1_wins_this_match,rounds))
+        print(get_ship_name(bot2)+" won %s/%s rounds."%(bot2_wins_this_match,rounds))
         if draws:
             print("%s draws."%draws)
+        for bot,bot_latencies in zip((bot1,bot2),latencies):
+            if bot_latencies.count:
+                print(get_ship_name(bot)+" move times: "+bot_latencies.get_summary())
+        if profile:
+            print_phase_tables((bot1,bot2),profiles)
+        close_results_writer(results_writer)
             
     else:
         print("Cannot setup match. At least one bot failed to load.\nbot1 = '%s'\nbot2 = '%s'" % (bot1, bot2))
 
-def run_robin(bots_folder,max_turns,logging,verbose,rounds=1):
+def run_robin(bots_folder,max_turns,logging,verbose,rounds=1,world_class=World,workers=1,master_seed=0,log_format=LOG_FORMAT.BINARY,
+              move_time=None,setup_time=None,sandbox_options=None,profile=False,results_path=None):
     "Runs a round robin tournment for all the bots in the given bots folder."
-    paths=get_bot_paths(bots_folder,verbose=verbose)
-    bots=[get_bot_from_path(path) for path in paths if is_valid_script(path,verbose=True)]
-    print("Starting round robin tournament for %s bots."%len(bots))
+    from itertools import combinations
+    from tournament import play_pairings_parallel, play_pairings_serial
+    paths,bots=get_folder_bots(bots_folder,verbose,sandbox_options)
+    print("Starting round robin tournament for %s bots. Master seed: %s"%(len(bots),master_seed))
     
     history={bot:[0,0,0] for bot in bots} #(wins,losses,draws)
     win_total={bot:0 for bot in bots}
     
-    for bot1, bot2 in combinations(bots,2):
-        bot1_wins_this_match=0
-        bot2_wins_this_match=0
-        for i in range(rounds):
-            game = Game(bot1, bot2, verbose=False, wait_seconds=0, max_turns=max_turns)
-            if logging:
-                path=get_versus_log_path(bot1,bot2)
-                game.write_log(path=path)
-                path=get_versus_log_path(bot2,bot1)
-                game.write_log(path=path)
-            
-            if game.outcome == OUTCOMES.PLAYER1_WIN:
-                bot1_wins_this_match+=1
-                win_total[bot1]+=1
-            elif game.outcome == OUTCOMES.PLAYER2_WIN:
-                bot2_wins_this_match+=1
-                win_total[bot2]+=1
+    pairs=list(combinations(range(len(bots)),2))
+    logger=get_logger(log_format,"robin") if logging else None
+    game_options=dict(verbose=False, wait_seconds=0, max_turns=max_turns, world_class=world_class,
+                      move_time=move_time, setup_time=setup_time)
+    from latency import LatencyHistogram
+    from profiling import PhaseProfile
+    latencies=[LatencyHistogram() for bot in bots]
+    profiles=[PhaseProfile() for bot in bots]
+    results_writer=get_results_writer(results_path)
+    if workers>1:
+        pair_results=play_pairings_parallel(paths,pairs,rounds,game_options,logger,master_seed,workers,latencies,sandbox_options,profiles,
+                                            results_writer)
+    else:
+        pair_results=play_pairings_serial(bots,pairs,rounds,game_options,logger,master_seed,latencies,profiles,results_writer,
+                                          paths)
+    latency_by_bot=dict(zip(bots,latencies))
+    if logger:
+        logger.close()
+    
+    for (i,j),(bot1_wins_this_match,bot2_wins_this_match,draws) in zip(pairs,pair_results):
+        bot1=bots[i]
+        bot2=bots[j]
+        win_total[bot1]+=bot1_wins_this_match
+        win_total[bot2]+=bot2_wins_this_match
                 
         if bot1_wins_this_match>bot2_wins_this_match:
             history[bot1][0]+=1
@@ -115,44 +272,77 @@ def run_robin(bots_folder,max_turns,logging,verbose,rounds=1):
         print("         %s Points. %s Wins. %s Losses. %s Draws."%(score,history[bot][0],history[bot][1],history[bot][2]))
         if rounds>1:
             print("         %s total wins. Won %s%% of %s games."%(wins,win_percent,games_per_bot))
+        print("         Move times: "+latency_by_bot[bot].get_summary())
         print("")
+    if profile:
+        print_phase_tables(bots,profiles)
+    close_results_writer(results_writer)
+
+def get_log_heatmaps(path):
+    """Parses a text log file to find ship placement and shot statistics.
+    This function is hacky and very sensitive to log format changes. Binary records are the preferred source."""
+    import json, re
+    ship_counts=array("L",[0])*(BOARD.WIDTH*BOARD.HEIGHT)
+    shot_counts=array("L",[0])*(BOARD.WIDTH*BOARD.HEIGHT)
+    with open(path,"r") as f:
+        data=f.read()
+    
+    setup_count=0
+    delimit=" ships = [("
+    for line in data.split("\n"):
+        if delimit in line:
+            setup_count+=1
+            ship_string=line.split(delimit[:-2])[1].lower().replace("(","[").replace(")","]")
+            ships=json.loads(ship_string)
+            for ship in ships:
+                for x,y in get_ship_coordinates(ship):
+                    ship_counts[x*BOARD.HEIGHT+y]+=1
+            if setup_count>1:
+                break
+    
+    r="shoots at \\([\\d],[\\d]\\)"
+    shots=re.findall(r,data)
+    for shot in shots:
+        shot_string=shot[10:].replace("(","[").replace(")","]")
+        xy=json.loads(shot_string)
+        shot_counts[xy[0]*BOARD.HEIGHT+xy[1]]+=1
+    return ship_counts,shot_counts
 
-def run_heatmap(log_folder,verbose):
-    "Parse log files to find ship placement and shot statistics."
-    "This function is hacky, untested, and very sensitive to log format changes."
+def get_heatmaps(path):
+    "Returns flat (ship counts, shot counts) arrays for a record file or a text log file."
+    from records import RECORD_EXTENSION, get_record_heatmaps
+    if path.endswith(RECORD_EXTENSION):
+        return get_record_heatmaps(path)
+    return get_log_heatmaps(path)
+
+def run_heatmap(log_folder,verbose,workers=1):
+    "Counts ship placement and shot statistics over every record and log file in log_folder."
+    from records import RECORD_EXTENSION
     if not os.path.isdir(log_folder):
         print("Cannot generate heatmap. Not a folder: '%s'"%log_folder)
         return
     
-    paths=get_matching_paths_recursively(log_folder,".log")
-    ship_heatmap=[[0 for i in range(BOARD.HEIGHT)] for j in range(BOARD.WIDTH)]
-    shot_heatmap=[[0 for i in range(BOARD.HEIGHT)] for j in range(BOARD.WIDTH)]
+    paths=get_matching_paths_recursively(log_folder,RECORD_EXTENSION)+get_matching_paths_recursively(log_folder,".log")
+    if not paths:
+        print("Cannot generate heatmap. No record or log files in: '%s'"%log_folder)
+        return
     
-    for path in paths:
-        with open(path,"r") as f:
-            data=f.read()
-        
-        setup_count=0
-        delimit=" ships = [("
-        for line in data.split("\n"):
-            if delimit in line:
-                setup_count+=1
-                ship_string=line.split(delimit[:-2])[1].lower().replace("(","[").replace(")","]")
-                ships=json.loads(ship_string)
-                for ship in ships:
-                    for x,y in get_ship_coordinates(ship):
-                        ship_heatmap[x][y]+=1                
-                if setup_count>1:
-                    break
-        
-        r="shoots at \\([\\d],[\\d]\\)"
-        shots=re.findall(r,data)
-        for shot in shots:
-            shot_string=shot[10:].replace("(","[").replace(")","]")
-            xy=json.loads(shot_string)
-            shot_heatmap[xy[0]][xy[1]]+=1
+    ship_counts=array("L",[0])*(BOARD.WIDTH*BOARD.HEIGHT)
+    shot_counts=array("L",[0])*(BOARD.WIDTH*BOARD.HEIGHT)
+    if workers>1:
+        from tournament import run_tasks
+        results=run_tasks(get_heatmaps,paths,workers)
+    else:
+        results=map(get_heatmaps,paths)
+    for file_ship_counts,file_shot_counts in results:
+        for i in range(BOARD.WIDTH*BOARD.HEIGHT):
+            ship_counts[i]+=file_ship_counts[i]
+            shot_counts[i]+=file_shot_counts[i]
+    
+    def get_grid(counts):
+        return [counts[i*BOARD.HEIGHT:(i+1)*BOARD.HEIGHT].tolist() for i in range(BOARD.WIDTH)]
     
-    generate_heatmap_html(ship_heatmap,shot_heatmap)
+    generate_heatmap_html(get_grid(ship_counts),get_grid(shot_counts))
 
 def generate_heatmap_html(ships,shots):
     folder="heatmaps"
@@ -187,29 +377,66 @@ def generate_heatmap_html(ships,shots):
     with open(folder+"/heatmap.html","w") as f:
         f.write(html)
 
-def run_benchmark(bots_folder,max_turns,logging,verbose,rounds=1):
+def run_replay(record_path,game_number):
+    "Lists the games in a binary record file, or prints the full log for one of them."
+    from records import read_game_records
+    if not os.path.isfile(record_path):
+        print("Cannot replay. Not a file: '%s'"%record_path)
+        return
+    
+    outcome_strings={OUTCOMES.DRAW:"Draw",OUTCOMES.IN_PROGRESS:"Not finished",
+                     OUTCOMES.PLAYER1_WIN:"Player 1 Win",OUTCOMES.PLAYER2_WIN:"Player 2 Win"}
+    for number,record in enumerate(read_game_records(record_path),1):
+        if not game_number:
+            names=" versus ".join([ship_name for ship_name,commander_name in record.names])
+            print("Game %s: %s. %s after %s shots. Game seed %s."%(number,names,
+                outcome_strings.get(record.outcome,"Unknown"),len(record.shots),record.seed))
+        elif str(number)==game_number:
+            print(record.get_log_text())
+            return
+    if game_number:
+        print("Cannot replay. No game number %s in '%s'"%(game_number,record_path))
+
+def run_benchmark(bots_folder,max_turns,logging,verbose,rounds=1,world_class=World,workers=1,master_seed=0,log_format=LOG_FORMAT.BINARY,
+                  move_time=None,setup_time=None,sandbox_options=None,profile=False,results_path=None):
     "Runs a benchmark for all the bots in the given bots folder."
+    from tournament import play_pairings_streaming, play_pairings_serial
     
     if not os.path.isfile(BENCHMARK_BOT_PATH):
         print("Cannot benchmark. Missing Commodore Bench script: '%s'"%BENCHMARK_BOT_PATH)
         return
     
-    paths=get_bot_paths(bots_folder,verbose=verbose)
-    bots=[get_bot_from_path(path) for path in paths if is_valid_script(path,verbose=True)]
-    print("Starting benchmark for %s bots."%len(bots))
+    paths,bots=get_folder_bots(bots_folder,verbose,sandbox_options)
+    print("Starting benchmark for %s bots. Master seed: %s"%(len(bots),master_seed))
     
     wins={bot:0 for bot in bots}
-    bench_bot=get_bot_from_path(BENCHMARK_BOT_PATH)
+    game_options=dict(verbose=False, wait_seconds=0, max_turns=max_turns, world_class=world_class,
+                      move_time=move_time, setup_time=setup_time)
+    from latency import LatencyHistogram
+    from profiling import PhaseProfile
+    latencies=[LatencyHistogram() for path in paths+[BENCHMARK_BOT_PATH]]
+    profiles=[PhaseProfile() for path in paths+[BENCHMARK_BOT_PATH]]
+    results_writer=get_results_writer(results_path)
+    latency_by_bot=dict(zip(bots,latencies))
     
-    for bot in bots:
-        for i in range(rounds):
-            game = Game(bot, bench_bot, verbose=False, wait_seconds=0, max_turns=max_turns)
-            if logging:
-                path=get_versus_log_path(bot,bench_bot)
-                game.write_log(path=path)
-                
-            if game.outcome == OUTCOMES.PLAYER1_WIN:
-                wins[bot]+=1
+    "The Commodore Bench is appended so each pair is (bot index, bench index)."
+    pairs=[(i,len(paths)) for i in range(len(paths))]
+    logger=get_logger(log_format,"benchmark") if logging else None
+    if workers>1:
+        results=play_pairings_streaming(paths+[BENCHMARK_BOT_PATH],pairs,rounds,game_options,logger,master_seed,workers,latencies,
+                                        sandbox_options,profiles,results_writer)
+        for i,(player_wins,bench_wins,draws) in results:
+            bot=bots[i]
+            wins[bot]=player_wins
+            print("'%s' finished. %s/%s wins against Commodore Bench."%(bot.ship_name,player_wins,rounds))
+    else:
+        bench_bot=get_bot(BENCHMARK_BOT_PATH,sandbox_options)
+        results=play_pairings_serial(bots+[bench_bot],pairs,rounds,game_options,logger,master_seed,latencies,profiles,results_writer,
+                                     paths+[BENCHMARK_BOT_PATH])
+        for bot,(player_wins,bench_wins,draws) in zip(bots,results):
+            wins[bot]=player_wins
+    if logger:
+        logger.close()
     
     scored_bots=[(wins[bot],bot) for bot in bots]
     sorted_bots=reversed(sorted(scored_bots,key=lambda x:x[0]))
@@ -220,8 +447,134 @@ def run_benchmark(bots_folder,max_turns,logging,verbose,rounds=1):
         win_percent=round(100*player_wins/rounds,2)
         print(rank_strings.get(rank,str(rank+1))+": '%s' by %s"%(bot.ship_name,bot.commander_name))
         print("         %s total wins against Commodore Bench. Won %s%% of %s games."%(player_wins,win_percent,rounds))
+        print("         Move times: "+latency_by_bot[bot].get_summary())
+    if profile:
+        print("")
+        print_phase_tables(bots,profiles)
+    close_results_writer(results_writer)
+
+def run_perf(output_path=None,baseline_path=None,tolerance_percent=10):
+    """Times the game engine, ship validators, whole games and a 'robin' tournament, then prints the results as JSON.
+    Returns False if any benchmark got slower than the baseline allows."""
+    import contextlib, io, json
+    from itertools import combinations
+    from perf import Benchmark, get_engine_benchmarks, run_benchmarks, compare_results, read_results, write_results
+    
+    baseline=read_results(baseline_path) if baseline_path else None
+    bot_count=len(get_bot_paths("bots",verbose=False))
+    robin_rounds=4
+    def robin(state):
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_robin("bots",250,False,False,rounds=robin_rounds,master_seed=0)
+    
+    benchmarks=get_engine_benchmarks()
+    benchmarks.append(Benchmark("run_robin",robin,operations=len(list(combinations(range(bot_count),2)))*robin_rounds,unit="game"))
+    results=run_benchmarks(benchmarks)
+    if baseline:
+        results["comparison"]=compare_results(results,baseline,tolerance_percent)
+    if output_path:
+        write_results(output_path,results)
+    print(json.dumps(results,indent=2,sort_keys=True))
+    
+    regressions=[name for name,change in results.get("comparison",{}).items() if change["regression"]]
+    for name in regressions:
+        sys.stderr.write("Slower than the baseline: %s, %+.1f%%\n"%(name,results["comparison"][name]["change_percent"]))
+    return not regressions
+
+def get_fast_args(argv):
+    """Parses simple command lines, like 'match a.py b.py --rounds=5', without loading docopt.
+    Returns the same dictionary docopt would, or None so docopt can handle anything else, like --help or mistakes."""
+    usages={}
+    args={"--help":False,"--version":False}
+    for line in __doc__.split("\n"):
+        words=line.split()
+        if words[:1]==["battleship.py"]:
+            usages[words[1]]=([word for word in words[2:] if word.startswith("<")],"[options]" in words)
+            args[words[1]]=False
+            for word in words[2:]:
+                if word.startswith("<"):
+                    args[word]=None
+        elif words and words[0].startswith("--"):
+            name,equals,value=words[0].partition("=")
+            args[name]=line.split("[default: ")[1].split("]")[0] if "[default: " in line else (None if equals else False)
+    
+    if not argv or argv[0] not in usages:
+        return None
+    positional_names,takes_options=usages[argv[0]]
+    args[argv[0]]=True
+    positionals=[]
+    for word in argv[1:]:
+        if not word.startswith("-"):
+            positionals.append(word)
+            continue
+        name,equals,value=word.partition("=")
+        if not takes_options or name not in args or not name.startswith("--") or name in ("--help","--version"):
+            return None
+        "Flags default to False, options with values to None or a string."
+        if (args[name] is False)==bool(equals):
+            return None
+        args[name]=value if equals else True
+    if len(positionals)!=len(positional_names):
+        return None
+    for name,value in zip(positional_names,positionals):
+        args[name]=value
+    return args
+
+def run_startup_profile(argv):
+    """Runs the command again in a new interpreter with -X importtime, then prints its total run time,
+    the time for an empty interpreter, and the slowest imports."""
+    import subprocess, time
+    def run(command):
+        start_time=time.perf_counter()
+        process=subprocess.run(command,stderr=subprocess.PIPE,universal_newlines=True)
+        return time.perf_counter()-start_time,process.stderr
+    
+    empty_seconds,_=run([sys.executable,"-c","pass"])
+    total_seconds,stderr=run([sys.executable,"-X","importtime",os.path.abspath(__file__)]+argv)
+    imports=[]
+    for line in stderr.split("\n"):
+        if not line.startswith("import time:") or "|" not in line:
+            sys.stderr.write(line+"\n" if line else "")
+            continue
+        self_time,cumulative,name=line[len("import time:"):].split("|")
+        if self_time.strip().isdigit():
+            imports.append((int(cumulative),int(self_time),name.rstrip()))
+    
+    top_level=[item for item in imports if not item[2].startswith("  ")]
+    print("\nStartup profile for: %s"%" ".join(argv))
+    print("  Whole command:      %.1f ms"%(total_seconds*1000))
+    print("  Empty interpreter:  %.1f ms"%(empty_seconds*1000))
+    print("  Imports:            %.1f ms over %s modules"%(sum([item[0] for item in top_level])/1000,len(imports)))
+    print("  Slowest imports, including what they import:")
+    for cumulative,self_time,name in sorted(top_level,reverse=True)[:10]:
+        print("    %8.1f ms  %s"%(cumulative/1000,name.strip()))
+
+def run_profiled(function,args):
+    "Runs function(args) under cProfile, then writes the stats to a file named after the subcommand."
+    import cProfile
+    commands=[name for name in ("match","test","robin","benchmark","heatmap","replay","perf") if args.get(name)]
+    folder="profiles"
+    os.makedirs(folder,exist_ok=True)
+    path=os.path.join(folder,(commands[0] if commands else "battleship")+".pstats")
+    profiler=cProfile.Profile()
+    profiler.enable()
+    try:
+        function(args)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print("\nWrote cProfile stats to '%s'. Games played in worker processes are not included. To read them, run:"%path)
+        print("    python -m pstats %s"%path)
 
 def main(args):
+    if args["--profile-startup"]:
+        run_startup_profile([arg for arg in sys.argv[1:] if arg!="--profile-startup"])
+    elif args["--profile"]:
+        run_profiled(run_command,args)
+    else:
+        run_command(args)
+
+def run_command(args):
     try:
         rounds = int(args["--rounds"])
         if rounds < 1:
@@ -242,20 +595,74 @@ def main(args):
         print("ABORT. Invalid max_turns: %s" % args["--max_turns"])
         return
 
+    try:
+        workers = max(1, int(args["--workers"]))
+    except:
+        print("ABORT. Invalid workers: %s" % args["--workers"])
+        return
+
+    try:
+        master_seed = int(args["--seed"]) if args["--seed"] else random.getrandbits(32)
+        game_seed = int(args["--game-seed"]) if args["--game-seed"] else None
+        assert game_seed is None or 0 <= game_seed < 2**64
+    except:
+        print("ABORT. Invalid seed: %s" % (args["--seed"] or args["--game-seed"]))
+        return
+
+    try:
+        batch_size = max(0, int(args["--batch"] or 0))
+    except:
+        print("ABORT. Invalid batch size: %s" % args["--batch"])
+        return
+
+    try:
+        move_time = float(args["--move-time"]) if args["--move-time"] else None
+        setup_time = float(args["--setup-time"]) if args["--setup-time"] else None
+        assert move_time is None or move_time > 0
+        assert setup_time is None or setup_time > 0
+    except:
+        print("ABORT. Invalid time limit: %s" % (args["--move-time"] or args["--setup-time"]))
+        return
+
+    sandbox_options = dict(move_time=move_time, setup_time=setup_time) if args["--sandbox"] else None
+
+    log_format = args["--log-format"]
+    if log_format not in (LOG_FORMAT.TEXT, LOG_FORMAT.BINARY):
+        print("ABORT. Invalid log format: %s" % log_format)
+        return
+
     verbose = args["--verbose"]
+    world_class = World
+    if args["--bitboard"]:
+        from bitworld import BitWorld
+        world_class = BitWorld
 
     if args["match"]:
         run_match(args["<player1-script-path>"],
                   args["<player2-script-path>"],
-                  rounds,wait_seconds,max_turns,args["--logging"],verbose)
+                  rounds,wait_seconds,max_turns,args["--logging"],verbose,world_class=world_class,workers=workers,
+                  master_seed=master_seed,game_seed=game_seed,log_format=log_format,batch_size=batch_size,
+                  move_time=move_time,setup_time=setup_time,sandbox_options=sandbox_options,profile=args["--profile"],results_path=args["--results"])
     elif args["test"]:
         run_unit_tests()
     elif args["robin"]:
-        run_robin(args["<bots-folder>"],max_turns,args["--logging"],verbose,rounds=rounds)
+        run_robin(args["<bots-folder>"],max_turns,args["--logging"],verbose,rounds=rounds,world_class=world_class,workers=workers,master_seed=master_seed,log_format=log_format,
+                  move_time=move_time,setup_time=setup_time,sandbox_options=sandbox_options,profile=args["--profile"],results_path=args["--results"])
     elif args["benchmark"]:
-        run_benchmark(args["<bots-folder>"],max_turns,args["--logging"],verbose,rounds=rounds)
+        run_benchmark(args["<bots-folder>"],max_turns,args["--logging"],verbose,rounds=rounds,world_class=world_class,workers=workers,master_seed=master_seed,log_format=log_format,
+                  move_time=move_time,setup_time=setup_time,sandbox_options=sandbox_options,profile=args["--profile"],results_path=args["--results"])
     elif args["heatmap"]:
-        run_heatmap(args["<log-folder>"],verbose)
+        run_heatmap(args["<log-folder>"],verbose,workers=workers)
+    elif args["replay"]:
+        run_replay(args["<record-path>"],args["--game"])
+    elif args["perf"]:
+        try:
+            tolerance_percent=float(args["--tolerance"])
+        except:
+            print("ABORT. Invalid tolerance: %s" % args["--tolerance"])
+            return
+        if not run_perf(args["--output"],args["--baseline"],tolerance_percent):
+            sys.exit(1)
 
 def is_windows_and_no_cli_args():
     return os.name=="nt" and len(sys.argv)==1
@@ -273,5 +680,8 @@ Instead of using Windows, you could use Linux instead where things are already s
 If after all of that you're still having trouble, try asking a friend or another student for help.""")
         input("\nPress Enter to Exit\n")
     else:
-        args = docopt(__doc__, version="1.0")
+        args = get_fast_args(sys.argv[1:])
+        if args is None:
+            from docopt import docopt
+            args = docopt(__doc__, version="1.0")
         main(args)
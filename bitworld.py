@@ -0,0 +1,80 @@
+from constants import *
+from utilities import *
+from world import World
+
+
+class BitWorld(World):
+    """A World that stores ships, shots and sunk cells as integer bitmasks.
+    Cell (x,y) is bit x*height+y. The public API is the same as World."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.ship_counter = 0
+
+        "Bitmask of the cells each ship id occupies."
+        self.ship_masks = {}
+
+        self.ships_mask = 0
+        self.shots_mask = 0
+        self.sunk_mask = 0
+        self.ships_error = None
+
+        "A set of all shots, if any, that was the last shot on a ship that sunk it."
+        self.sunk_shots = set()
+
+        self.init_views()
+
+    def get_bit(self, x, y):
+        return 1 << (x * self.height + y)
+
+    def get_shots_column(self, x):
+        column = self.shots_mask >> (x * self.height)
+        return tuple([(column >> j) & 1 for j in range(self.height)])
+
+    def get_ships(self):
+        ships = [[0 for i in range(self.height)] for j in range(self.width)]
+        for ship_id, mask in self.ship_masks.items():
+            for i in range(self.width):
+                for j in range(self.height):
+                    if mask & self.get_bit(i, j):
+                        ships[i][j] = ship_id
+        return self.get_tuple_array(ships)
+
+    def get_hits_column(self, x):
+        column = (self.ships_mask & self.shots_mask) >> (x * self.height)
+        hits = [(column >> j) & 1 for j in range(self.height)]
+        for sunk_x, sunk_y in self.sunk_shots:
+            if sunk_x == x:
+                hits[sunk_y] = 2
+        return tuple(hits)
+
+    def shoot(self, x, y):
+        "Shoots this cell."
+        bit = self.get_bit(x, y)
+        new_shot = not self.shots_mask & bit
+        self.shots_mask |= bit
+        self.dirty_columns.add(x)
+        if new_shot and self.ships_mask & bit:
+            for mask in self.ship_masks.values():
+                if mask & bit:
+                    if not mask & ~self.shots_mask:
+                        self.sunk_mask |= mask
+                        self.sunk_shots.add((x, y))
+                    break
+
+    def is_ship_sunk(self, x, y):
+        "Returns true if there is a ship at this position and it is completely sunk."
+        return bool(self.sunk_mask & self.get_bit(x, y))
+
+    def is_navy_alive(self):
+        "Returns true if at least one ship cell is not hit yet."
+        return bool(self.ships_mask & ~self.shots_mask)
+
+    def add_ship(self, ship_id, coordinates, mask):
+        self.ship_masks[ship_id] = mask
+        self.ships_mask |= mask
+        for x, y in coordinates:
+            self.dirty_columns.add(x)
+        if not mask & ~self.shots_mask:
+            self.sunk_mask |= mask
@@ -8,6 +8,9 @@ BOARD.SHIP_COUNT = len(BOARD.SHIP_LENGTHS)
 
 BENCHMARK_BOT_PATH="bots/commodore_bench.py"
 
+"Results kept between runs, like which bot scripts already passed validation."
+CACHE_FOLDER=".battleship_cache"
+
 class OUTCOMES:
     PLAYER1_WIN = 0
     PLAYER2_WIN = 1
@@ -15,6 +18,25 @@ class OUTCOMES:
     DRAW = 3
 
 
+class PHASE:
+    "Parts of a game that are timed for each bot. Setup and think are the bot's own time, the rest is the game engine's."
+    SETUP = "setup"
+    VALIDATION = "validation"
+    SNAPSHOT = "snapshot"
+    THINK = "think"
+    SHOOT = "shoot"
+    LOGGING = "logging"
+
+
+PHASES = (PHASE.SETUP, PHASE.VALIDATION, PHASE.SNAPSHOT, PHASE.THINK, PHASE.SHOOT, PHASE.LOGGING)
+BOT_PHASES = (PHASE.SETUP, PHASE.THINK)
+
+
+class LOG_FORMAT:
+    TEXT = "text"
+    BINARY = "binary"
+
+
 class SHIPS_ERROR:
     BASIC_TYPE="ships is a bad type"
     COUNT="wrong number of ships"
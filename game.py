@@ -1,14 +1,17 @@
 import random
-
+import sys
 import time
 
 from constants import *
+from latency import LatencyHistogram
+from profiling import PhaseProfile
 from utilities import *
 from world import World
 
 
 class Game:
-    def __init__(self, bot1, bot2, autostart=True, verbose=False, wait_seconds=0,max_turns=1000):
+    def __init__(self, bot1, bot2, autostart=True, verbose=False, wait_seconds=0,max_turns=1000,world_class=World,seed=None,
+                 move_time=None, setup_time=None):
         self.verbose = verbose
         self.round_counter = 0
         self.winner = -1
@@ -16,7 +19,29 @@ class Game:
         self.log_entries = []
         self.max_turns=max_turns
 
-        self.worlds = (World(BOARD.WIDTH, BOARD.HEIGHT), World(BOARD.WIDTH, BOARD.HEIGHT))
+        "Every random choice in this game, including the bots' own, comes from this seed."
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.first_player = -1
+
+        "The ship setups and every (player, x, y) shot, kept so board snapshots can be rendered later."
+        self.setups = [None, None]
+        self.shot_history = []
+
+        """Seconds a bot may take for each get_move and get_setup call, or None for no limit.
+        Bots run in this process and can't be interrupted, so a slow call forfeits once it returns."""
+        self.move_time = move_time
+        self.setup_time = setup_time
+        self.move_latencies = (LatencyHistogram(), LatencyHistogram())
+
+        "Time spent in each phase of the game, for each player's side of it. See profiling.py."
+        self.phase_profiles = (PhaseProfile(), PhaseProfile())
+        for profile in self.phase_profiles:
+            profile.games = 1
+
+        self.world_class = world_class
+        self.worlds = (world_class(BOARD.WIDTH, BOARD.HEIGHT), world_class(BOARD.WIDTH, BOARD.HEIGHT))
         self.bots = (bot1, bot2)
         self.outcome = OUTCOMES.IN_PROGRESS
 
@@ -24,24 +49,44 @@ class Game:
             self.play()
 
     def setup(self):
+        self.log("Game seed = %s" % self.seed)
         for player in range(2):
             world = self.worlds[player]
             bot = self.bots[player]
+            profile = self.phase_profiles[player]
 
+            set_game_seed(bot, player, self.seed)
             try:
-                ships = bot.get_setup()
+                start_time = time.perf_counter()
+                try:
+                    ships = bot.get_setup()
+                finally:
+                    elapsed = time.perf_counter() - start_time
+                    profile.add(PHASE.SETUP, elapsed)
             except:
                 self.set_loser(player, message="Ship setup crashed.")
                 self.log_exception()
                 return False
 
+            if self.setup_time is not None and elapsed > self.setup_time:
+                self.set_loser(player, message="'%s' took %.3f seconds for its ship setup, over the %s second limit." %
+                               (self.get_ship_name(bot), elapsed, self.setup_time))
+                return False
+
+            self.setups[player] = ships
+            start_time = time.perf_counter()
             self.log("Player %s ships = " % (player + 1) + str(ships))
-            if not world.set_ships(ships):
-                self.set_loser(player, message="Bad ship setup.")
+            validation_start_time = time.perf_counter()
+            valid = world.set_ships(ships)
+            profile.add(PHASE.VALIDATION, time.perf_counter() - validation_start_time)
+            profile.add(PHASE.LOGGING, validation_start_time - start_time)
+            if not valid:
+                self.set_loser(player, message="Bad ship setup: %s." % world.ships_error)
                 return False
         return True
 
     def log_exception(self):
+        import traceback
         exc_type, exc_value, exc_traceback = sys.exc_info()
         text = "\n".join(traceback.format_exception(exc_type, exc_value, exc_traceback))
         self.log(text)
@@ -50,6 +95,35 @@ class Game:
         self.log_entries.append(text)
         if self.verbose:
             print(text)
+
+    def log_boards(self, label):
+        """Logs a snapshot of both boards. Only the shot count is stored,
+        the boards are rendered when the log is printed or written."""
+        self.log_entries.append((label, len(self.shot_history)))
+        if self.verbose:
+            print(label + "\n" + self.worlds[0].to_string(other_world=self.worlds[1]))
+
+    def get_log_lines(self):
+        "Returns the log as a list of strings, rendering board snapshots by replaying the shots."
+        worlds = (self.world_class(BOARD.WIDTH, BOARD.HEIGHT), self.world_class(BOARD.WIDTH, BOARD.HEIGHT))
+        ships_placed = False
+        replayed_shots = 0
+        lines = []
+        for entry in self.log_entries:
+            if type(entry) is str:
+                lines.append(entry)
+                continue
+
+            label, shot_count = entry
+            if not ships_placed:
+                for player in range(2):
+                    worlds[player].set_ships(self.setups[player])
+                ships_placed = True
+            for player, x, y in self.shot_history[replayed_shots:shot_count]:
+                worlds[(player + 1) % 2].shoot(x, y)
+            replayed_shots = shot_count
+            lines.append(label + "\n" + worlds[0].to_string(other_world=worlds[1]))
+        return lines
             
     def set_draw(self):
         message="Game declared a draw - maximum turns of %s reached."%self.max_turns
@@ -73,62 +147,99 @@ class Game:
             raise ValueError("set_winner got a bad player_index = '%s'" % player_index)
 
     def get_ship_name(self, bot):
-        try:
-            return bot.ship_name
-        except:
-            return "Unknown"
+        return get_ship_name(bot)
 
     def play(self):
         "This uses bot1 and bot2 to setup the board and play until the game ends."
+        """The engine's choices and the bots' come from different sub-seeds, so no bot can predict who moves first.
+        Bots share the global random module, so it is seeded too to make their moves reproducible.
+        Each bot is also given its own seed as bot.game_seed before its ship setup."""
+        random.seed(get_sub_seed(self.seed, "bots"))
+        self.random = random.Random(get_sub_seed(self.seed, "first"))
         if not self.setup():
             return
 
-        player = random.randint(0, 1)
+        """Seconds each player spent in the snapshot, logging and shoot phases. They are kept in lists during the game
+        and added to the phase profiles at the end, since that is faster than adding them every turn."""
+        phase_seconds = ([0.0, 0.0, 0.0], [0.0, 0.0, 0.0])
+
+        self.first_player = self.random.randint(0, 1)
+        player = (self.first_player + 1) % 2
         while self.outcome == OUTCOMES.IN_PROGRESS:
             other_player = player
             player = (player + 1) % 2
             world = self.worlds[player]
             other_world = self.worlds[other_player]
             bot = self.bots[player]
+            seconds = phase_seconds[player]
             player_label = "Player %s (%s)" % (player + 1, self.get_ship_name(bot))
 
+            snapshot_start_time = time.perf_counter()
             hits = other_world.get_hits()
             shots = other_world.get_shots()
+            seconds[0] += time.perf_counter() - snapshot_start_time
 
             self.round_counter += 1
 
             if self.round_counter == 1:
+                log_start_time = time.perf_counter()
                 message = "%s gets the first move." % (player_label)
                 self.log(message)
+                seconds[1] += time.perf_counter() - log_start_time
                 
             if self.round_counter>self.max_turns:
                 self.set_draw()
                 break
 
             "print and log displays for both board worlds"
-            label = "Round %s" % self.round_counter
-            output = self.worlds[0].to_string(other_world=self.worlds[1])
-            self.log(label + "\n" + output)
+            log_start_time = time.perf_counter()
+            self.log_boards("Round %s" % self.round_counter)
+            seconds[1] += time.perf_counter() - log_start_time
 
             "get shoot at coordinates"
             try:
-                x, y = bot.get_move(hits=hits, shots=shots)
+                start_time = time.perf_counter()
+                try:
+                    x, y = bot.get_move(hits=hits, shots=shots)
+                finally:
+                    "Moves that crash or time out are counted too."
+                    elapsed = time.perf_counter() - start_time
+                    self.move_latencies[player].add(elapsed)
                 assert type(x) is int
                 assert type(y) is int
+                assert other_world.is_in_bounds(x, y)
             except:
                 self.set_loser(player, message="'%s' crashed during its turn." % self.get_ship_name(bot))
                 self.log_exception()
                 break
 
+            if self.move_time is not None and elapsed > self.move_time:
+                self.set_loser(player, message="'%s' took %.3f seconds for its turn, over the %s second limit." %
+                               (self.get_ship_name(bot), elapsed, self.move_time))
+                break
+
             "shoot those coordinates, print, and log."
+            log_start_time = time.perf_counter()
             message = "%s shoots at (%s,%s)" % (player_label, x, y)
             self.log(message)
+            shoot_start_time = time.perf_counter()
+            seconds[1] += shoot_start_time - log_start_time
             other_world.shoot(x, y)
-            if not other_world.is_navy_alive():
+            self.shot_history.append((player, x, y))
+            navy_alive = other_world.is_navy_alive()
+            seconds[2] += time.perf_counter() - shoot_start_time
+            if not navy_alive:
                 self.set_winner(player)
                 break
 
             time.sleep(self.wait_seconds)
+
+        for player in range(2):
+            profile = self.phase_profiles[player]
+            latencies = self.move_latencies[player]
+            profile.add(PHASE.THINK, latencies.total, latencies.count)
+            for phase, seconds in zip((PHASE.SNAPSHOT, PHASE.LOGGING, PHASE.SHOOT), phase_seconds[player]):
+                profile.add(phase, seconds, latencies.count)
             
         text="Game over! "
         if self.outcome == OUTCOMES.DRAW:
@@ -141,7 +252,7 @@ class Game:
         if not path:
             path = get_next_log_path()
         with open(path, "w") as f:
-            f.write("\n".join(self.log_entries))
+            f.write("\n".join(self.get_log_lines()))
 
     def get_winner_label(self):
         if self.winner == -1:
@@ -0,0 +1,73 @@
+import math
+
+"""This module keeps histograms of how long bots take to answer, in log sized buckets.
+
+Bucket edges grow by a fixed ratio, so a histogram stays small however many calls it counts,
+and percentiles are accurate to within one bucket, about 19%. Histograms from different games
+or worker processes are combined with merge."""
+
+"Calls faster than this all go in the first bucket."
+MIN_SECONDS = 1e-6
+
+BUCKETS_PER_DOUBLING = 4
+
+
+def get_bucket(seconds):
+    if seconds < MIN_SECONDS:
+        return 0
+    return int(math.log2(seconds / MIN_SECONDS) * BUCKETS_PER_DOUBLING) + 1
+
+
+def get_bucket_limit(bucket):
+    "Returns the upper edge of a bucket, in seconds."
+    return MIN_SECONDS * 2 ** (bucket / BUCKETS_PER_DOUBLING)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        "Number of calls in each bucket, keyed by bucket number."
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        bucket = get_bucket(seconds)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        "Adds every call counted by another histogram to this one."
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def get_percentile(self, percent):
+        "Returns the time in seconds that this percentage of calls finished within, or 0 if there were none."
+        if not self.count:
+            return 0.0
+        target = math.ceil(self.count * percent / 100)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(get_bucket_limit(bucket), self.max)
+        return self.max
+
+    def get_summary(self):
+        "Returns a line like 'p50 0.12 ms, p99 1.5 ms, max 3.2 ms over 410 moves.'"
+        if not self.count:
+            return "No moves."
+        return "p50 %s ms, p99 %s ms, max %s ms over %s moves." % (
+            format_milliseconds(self.get_percentile(50)),
+            format_milliseconds(self.get_percentile(99)),
+            format_milliseconds(self.max),
+            self.count)
+
+
+def format_milliseconds(seconds):
+    return "%.3g" % (seconds * 1000)
@@ -0,0 +1,179 @@
+import os
+import queue
+import threading
+import time
+
+from constants import *
+from records import *
+from utilities import *
+
+"""This module writes finished games to the 'logs' folder on a background thread.
+
+Games are queued by GameLogger.write and written in batches, so playing never waits on the disk.
+Every game is written once. An index file next to the logs maps both versus orderings of the
+two bots, like 'ssrandom-versus-sssequential' and 'sssequential-versus-ssrandom', to where the
+game was written: a byte offset into the record file, or the path of a text log."""
+
+INDEX_EXTENSION = ".idx"
+
+
+class GameLogger:
+    "Queues finished games and writes them in batches from a background thread."
+
+    "Games written together in one batch, at most."
+    BATCH_SIZE = 256
+
+    def __init__(self, log_format, label, versus=True):
+        self.log_format = log_format
+        self.label = label
+        self.versus = versus
+        self.path = None
+        if log_format == LOG_FORMAT.BINARY:
+            self.path, self.index_path = claim_record_paths(label)
+            create_record_file(self.path)
+        else:
+            self.index_path = get_next_log_path(label=label, extension=INDEX_EXTENSION)
+
+        "The queue and thread are started by the first write in each process."
+        self.queue = None
+        self.thread = None
+        "The first error the background thread hit, raised by flush and close."
+        self.error = None
+
+    def __getstate__(self):
+        "Worker processes get a copy without the queue or thread, and start their own."
+        state = self.__dict__.copy()
+        state["queue"] = None
+        state["thread"] = None
+        state["error"] = None
+        return state
+
+    def write(self, game):
+        """Queues a finished game to be written. Binary records are encoded now so the Game can be freed.
+        The time this takes is added to the logging phase of the game's profiles, half to each bot."""
+        start_time = time.perf_counter()
+        if not self.thread:
+            self.start()
+        bot1, bot2 = game.bots
+        labels = (get_versus_label(bot1, bot2), get_versus_label(bot2, bot1))
+        if self.log_format == LOG_FORMAT.BINARY:
+            self.queue.put((labels, get_game_record(game).encode()))
+        else:
+            self.queue.put((labels, game))
+        log_seconds = (time.perf_counter() - start_time) / 2
+        for profile in game.phase_profiles:
+            profile.add(PHASE.LOGGING, log_seconds)
+
+    def start(self):
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def flush(self):
+        "Waits until every queued game has been written. Raises the error if the background thread hit one."
+        if self.queue:
+            self.queue.join()
+        self.raise_error()
+
+    def close(self):
+        "Writes every queued game and stops the background thread. Raises the error if it hit one."
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self.raise_error()
+
+    def raise_error(self):
+        if self.error:
+            raise self.error
+
+    def run(self):
+        """The background thread. Takes whatever is queued, up to BATCH_SIZE games, and writes it in one go.
+        Every item is marked done even if writing fails, so flush and close never wait forever.
+        After an error, later games are dropped, and every flush or close raises it."""
+        record_fd = None
+        index_fd = None
+        try:
+            record_fd = os.open(self.path, os.O_WRONLY | os.O_APPEND) if self.path else None
+            index_fd = os.open(self.index_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        except OSError as error:
+            self.error = error
+
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < self.BATCH_SIZE and not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                if None in batch:
+                    stopping = True
+                items = [item for item in batch if item is not None]
+
+                if items and not self.error:
+                    if record_fd is None:
+                        index_lines = self.write_text_logs(items)
+                    else:
+                        index_lines = self.write_records(record_fd, items)
+                    os.write(index_fd, "".join(index_lines).encode("utf-8"))
+            except Exception as error:
+                self.error = error
+            finally:
+                for item in batch:
+                    self.queue.task_done()
+
+        for fd in (record_fd, index_fd):
+            if fd is not None:
+                os.close(fd)
+
+    def write_records(self, record_fd, items):
+        """Appends a batch of encoded records with a single write. Returns the index lines.
+        Other processes may append to the same file, so offsets are worked back from where this write ended.
+        That only works if the whole batch went out in one write, so a short write raises, and run records the error."""
+        data = b"".join([LENGTH_PREFIX.pack(len(record)) + record for labels, record in items])
+        written = os.write(record_fd, data)
+        if written != len(data):
+            raise OSError("Wrote only %s of %s bytes to '%s'. The disk may be full." % (written, len(data), self.path))
+        offset = os.lseek(record_fd, 0, os.SEEK_CUR) - len(data)
+
+        index_lines = []
+        for labels, record in items:
+            for label in labels:
+                index_lines.append("%s\t%s\n" % (label, offset))
+            offset += LENGTH_PREFIX.size + len(record)
+        return index_lines
+
+    def write_text_logs(self, items):
+        "Renders and writes a text log for each game. Returns the index lines."
+        index_lines = []
+        for labels, game in items:
+            path = get_next_log_path(label=labels[0] if self.versus else self.label)
+            game.write_log(path=path)
+            for label in labels:
+                index_lines.append("%s\t%s\n" % (label, path))
+        return index_lines
+
+
+def claim_record_paths(label):
+    """Claims a new record file path and the index path next to it, both with O_EXCL.
+    An index may already be taken by a text format run, so then the record number is given back and the next one tried.
+    That way a run never appends to another run's index."""
+    while True:
+        path = get_next_log_path(label=label, extension=RECORD_EXTENSION)
+        index_path = path[:-len(RECORD_EXTENSION)] + INDEX_EXTENSION
+        try:
+            os.close(os.open(index_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return path, index_path
+        except FileExistsError:
+            os.remove(path)
+
+
+def read_log_index(path):
+    "Reads an index file into a dictionary of versus label to a list of record offsets or log paths."
+    index = {}
+    with open(path, "r") as f:
+        for line in f:
+            label, location = line.rstrip("\n").split("\t")
+            if location.isdigit():
+                location = int(location)
+            index.setdefault(label, []).append(location)
+    return index
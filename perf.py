@@ -0,0 +1,180 @@
+import json
+import platform
+import time
+
+from constants import *
+from game import Game
+from utilities import *
+from world import World
+from bitworld import BitWorld
+
+"""This module times the game engine, so changes to it can be checked for speed.
+
+Each benchmark is a name, a run function, an optional setup function and how many operations
+one run does. Setups are not timed. They build fresh state, like an empty world, for runs that use it up.
+Runs are timed in batches that take at least BATCH_SECONDS, and the fastest of REPEATS batches is kept,
+since slower batches mostly measure other work on the machine.
+
+Results are a JSON friendly dictionary. Saved results can be used as a baseline for a later run,
+which reports how much each benchmark changed and which got slower than the tolerance allows."""
+
+VERSION = 1
+BATCH_SECONDS = 0.02
+REPEATS = 5
+
+"Percent slower than the baseline a benchmark may get before it counts as a regression."
+TOLERANCE_PERCENT = 10
+
+"A legal fleet, and an order to shoot every cell in, so runs do the same work every time."
+SHIPS = ((5, 0, 0, False), (4, 9, 0, True), (3, 7, 9, False), (3, 5, 5, False), (2, 0, 8, True))
+CELLS = [(x * 3 % BOARD.WIDTH, (x + y * 7) % BOARD.HEIGHT) for x in range(BOARD.WIDTH) for y in range(BOARD.HEIGHT)]
+
+GAME_BOTS = ("bots/random.py", "bots/sequential.py")
+GAME_SEEDS = 16
+
+
+class Benchmark:
+    def __init__(self, name, run, setup=None, operations=1, unit="call"):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.operations = operations
+        self.unit = unit
+
+
+def time_batch(benchmark, number):
+    "Returns the seconds number runs took, not counting their setups."
+    states = [benchmark.setup() if benchmark.setup else None for i in range(number)]
+    start_time = time.perf_counter()
+    for state in states:
+        benchmark.run(state)
+    return time.perf_counter() - start_time
+
+
+def time_benchmark(benchmark, batch_seconds=BATCH_SECONDS, repeats=REPEATS):
+    "Returns the fastest seconds per operation over repeats batches."
+    number = 1
+    while True:
+        seconds = time_batch(benchmark, number)
+        if seconds >= batch_seconds:
+            break
+        number *= 2
+    best = seconds
+    for repeat in range(repeats - 1):
+        best = min(best, time_batch(benchmark, number))
+    return best / (number * benchmark.operations)
+
+
+def get_shot_world(world_class, shot_count):
+    world = world_class(BOARD.WIDTH, BOARD.HEIGHT)
+    world.set_ships(SHIPS)
+    for x, y in CELLS[:shot_count]:
+        world.shoot(x, y)
+    world.get_hits()
+    return world
+
+
+def get_world_benchmarks(world_class):
+    name = world_class.__name__
+    half_shot_world = get_shot_world(world_class, len(CELLS) // 2)
+    other_world = get_shot_world(world_class, len(CELLS) // 3)
+
+    def new_world():
+        return world_class(BOARD.WIDTH, BOARD.HEIGHT)
+
+    def shoot_every_cell(world):
+        for x, y in CELLS:
+            world.shoot(x, y)
+
+    def get_hits(state):
+        "A shot marks one column to rebuild, as happens every turn of a game."
+        half_shot_world.dirty_columns.add(0)
+        half_shot_world.get_hits()
+
+    def get_shots(state):
+        half_shot_world.dirty_columns.add(0)
+        half_shot_world.get_shots()
+
+    return [
+        Benchmark(name + ".set_ships", lambda world: world.set_ships(SHIPS), new_world, unit="fleet"),
+        Benchmark(name + ".shoot", shoot_every_cell, lambda: get_shot_world(world_class, 0), len(CELLS), unit="shot"),
+        Benchmark(name + ".get_hits", get_hits),
+        Benchmark(name + ".get_shots", get_shots),
+        Benchmark(name + ".to_string", lambda state: half_shot_world.to_string(other_world)),
+        Benchmark(name + ".is_ships_valid", lambda state: half_shot_world.is_ships_valid(SHIPS), unit="fleet"),
+    ]
+
+
+def get_validation_benchmarks():
+    def for_each_ship(function):
+        def run(state):
+            for ship in SHIPS:
+                function(ship)
+        return run
+
+    return [
+        Benchmark("utilities.is_ship_valid", for_each_ship(is_ship_valid), operations=len(SHIPS), unit="ship"),
+        Benchmark("utilities.is_ship_in_world", for_each_ship(is_ship_in_world), operations=len(SHIPS), unit="ship"),
+        Benchmark("utilities.get_ship_coordinates", for_each_ship(get_ship_coordinates), operations=len(SHIPS), unit="ship"),
+        Benchmark("utilities.are_ships_valid", lambda state: are_ships_valid(SHIPS), unit="fleet"),
+        Benchmark("utilities.do_ships_overlap", lambda state: do_ships_overlap(SHIPS), unit="fleet"),
+        Benchmark("utilities.do_ships_touch", lambda state: do_ships_touch(SHIPS), unit="fleet"),
+    ]
+
+
+def get_game_benchmarks(world_class):
+    "Plays whole games between the demo bots, going through GAME_SEEDS fixed seeds in turn."
+    bot1, bot2 = [get_bot_from_path(path) for path in GAME_BOTS]
+    seeds = [get_game_seed(0, i) for i in range(GAME_SEEDS)]
+
+    def play(state):
+        for seed in seeds:
+            Game(bot1, bot2, world_class=world_class, seed=seed)
+
+    return [Benchmark(world_class.__name__ + ".Game.play", play, operations=len(seeds), unit="game")]
+
+
+def get_engine_benchmarks():
+    "Returns the benchmarks for both world classes, the ship validators and whole games."
+    benchmarks = []
+    for world_class in (World, BitWorld):
+        benchmarks += get_world_benchmarks(world_class)
+    benchmarks += get_validation_benchmarks()
+    for world_class in (World, BitWorld):
+        benchmarks += get_game_benchmarks(world_class)
+    return benchmarks
+
+
+def run_benchmarks(benchmarks, batch_seconds=BATCH_SECONDS, repeats=REPEATS):
+    "Times every benchmark and returns the results as a dictionary that can be saved as JSON."
+    results = {}
+    for benchmark in benchmarks:
+        seconds = time_benchmark(benchmark, batch_seconds, repeats)
+        results[benchmark.name] = dict(seconds=seconds, per_second=1 / seconds if seconds else None, unit=benchmark.unit)
+    return dict(version=VERSION, python=platform.python_version(), benchmarks=results)
+
+
+def compare_results(results, baseline, tolerance_percent=TOLERANCE_PERCENT):
+    """Returns a dictionary of how each benchmark in both results and baseline changed.
+    Positive changes are slower. Changes over tolerance_percent are marked as regressions."""
+    comparison = {}
+    baseline_benchmarks = baseline.get("benchmarks", {})
+    for name, result in results["benchmarks"].items():
+        if name not in baseline_benchmarks or not baseline_benchmarks[name]["seconds"]:
+            continue
+        baseline_seconds = baseline_benchmarks[name]["seconds"]
+        change_percent = 100 * (result["seconds"] - baseline_seconds) / baseline_seconds
+        comparison[name] = dict(baseline_seconds=baseline_seconds, seconds=result["seconds"],
+                                change_percent=round(change_percent, 1), regression=change_percent > tolerance_percent)
+    return comparison
+
+
+def read_results(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_results(path, results):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
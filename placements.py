@@ -0,0 +1,114 @@
+from constants import *
+
+"""This module holds an index of every ship placement that fits inside the board.
+
+Placements are keyed by (length, x, y, rotation), for every length in BOARD.SHIP_LENGTHS, and each is
+built once, the first time it is looked up.
+Each one carries its cells, its cell bitmask and the bitmask of the cells around it, using the
+same bit layout as BitWorld: cell (x,y) is bit x*BOARD.HEIGHT+y. Validation in utilities and World,
+and bots that enumerate placements, can look these up instead of recomputing them."""
+
+
+def get_cell_bit(x, y):
+    return 1 << (x * BOARD.HEIGHT + y)
+
+
+def is_corner_cell(x, y):
+    "Returns True for the cut off corner cells that are drawn blank and that is_ship_in_world rejects."
+    return ((x < 2 and y < 1) or (x < 1 and y < 2) or
+            (x > 7 and y < 1) or (x > 8 and y < 2) or
+            (y > 7 and x > 8) or (y > 8 and x > 7) or
+            (y > 7 and x < 1) or (x < 2 and y > 8))
+
+
+class Placement:
+    def __init__(self, ship_length, x, y, rotation):
+        self.ship = (ship_length, x, y, rotation)
+        x_vector = 0 if rotation else 1
+        y_vector = 1 if rotation else 0
+        self.coordinates = tuple([(x + x_vector * i, y + y_vector * i) for i in range(ship_length)])
+
+        "Cell indexes, x*BOARD.HEIGHT+y, of every cell the ship covers."
+        self.cells = tuple([cell_x * BOARD.HEIGHT + cell_y for cell_x, cell_y in self.coordinates])
+
+        self.mask = 0
+        for cell_x, cell_y in self.coordinates:
+            self.mask |= get_cell_bit(cell_x, cell_y)
+
+        "Cells sharing an edge with the ship. Another ship here would be touching it."
+        neighbours = set()
+        for cell_x, cell_y in self.coordinates:
+            for x2, y2 in ((cell_x - 1, cell_y), (cell_x + 1, cell_y), (cell_x, cell_y - 1), (cell_x, cell_y + 1)):
+                if 0 <= x2 < BOARD.WIDTH and 0 <= y2 < BOARD.HEIGHT:
+                    neighbours.add(x2 * BOARD.HEIGHT + y2)
+        self.neighbour_cells = tuple(sorted(neighbours.difference(self.cells)))
+        self.neighbour_mask = 0
+        for cell in self.neighbour_cells:
+            self.neighbour_mask |= 1 << cell
+
+        self.is_in_world = not any([is_corner_cell(cell_x, cell_y) for cell_x, cell_y in self.coordinates])
+
+
+class PlacementIndex:
+    "Every placement that fits on the board, listed by ship length and by the cells each one covers or touches."
+    def __init__(self):
+        self.placements = []
+        for ship_length in sorted(set(BOARD.SHIP_LENGTHS)):
+            for rotation in (False, True):
+                for x in range(BOARD.WIDTH):
+                    for y in range(BOARD.HEIGHT):
+                        placement = get_placement((ship_length, x, y, rotation))
+                        if placement:
+                            self.placements.append(placement)
+
+        self.by_length = {ship_length: [p for p in self.placements if p.ship[0] == ship_length]
+                          for ship_length in set(BOARD.SHIP_LENGTHS)}
+
+        "For each cell index, the placements covering it and the placements that would touch it."
+        self.by_cell = [[] for i in range(BOARD.WIDTH * BOARD.HEIGHT)]
+        self.touching_cell = [[] for i in range(BOARD.WIDTH * BOARD.HEIGHT)]
+        for placement in self.placements:
+            for cell in placement.cells:
+                self.by_cell[cell].append(placement)
+            for cell in placement.neighbour_cells:
+                self.touching_cell[cell].append(placement)
+
+
+"Placements looked up so far, keyed by (length, x, y, rotation). Building all of them up front would slow down startup."
+PLACEMENTS = {}
+
+_placement_index = None
+
+
+def get_placement_index():
+    "Returns the PlacementIndex, building it the first time it is needed."
+    global _placement_index
+    if _placement_index is None:
+        _placement_index = PlacementIndex()
+    return _placement_index
+
+
+def is_length_indexed(ship_length):
+    return ship_length in BOARD.SHIP_LENGTHS
+
+
+def get_placement(ship):
+    """Returns the Placement for this ship, or None if it is not valid ship data, does not fit
+    inside the board, or has a length that is not in BOARD.SHIP_LENGTHS."""
+    if type(ship) not in (tuple, list) or len(ship) != 4:
+        return None
+    ship_length, x, y, rotation = ship
+    if type(ship_length) is not int or type(x) is not int or type(y) is not int:
+        return None
+    if rotation not in (True, False, 0, 1):
+        return None
+
+    key = (ship_length, x, y, bool(rotation))
+    placement = PLACEMENTS.get(key)
+    if placement is None:
+        if ship_length not in BOARD.SHIP_LENGTHS or x < 0 or y < 0:
+            return None
+        if x + (1 if rotation else ship_length) > BOARD.WIDTH or y + (ship_length if rotation else 1) > BOARD.HEIGHT:
+            return None
+        placement = PLACEMENTS[key] = Placement(*key)
+    return placement
@@ -0,0 +1,49 @@
+from constants import *
+
+"""This module adds up how long each phase of a game takes, for one bot's side of its games.
+
+Game times every phase with a few perf_counter calls per turn, so profiles are always kept.
+Turns are added up in the game and added to its profiles once it ends.
+Phases are listed in PHASE. Setup and think time is spent in the bot, the rest in the game engine,
+so the table shows whether a slow league is down to slow bots or to engine overhead.
+Logging is the time in Game's log calls, plus half the time GameLogger.write takes to queue the game for each bot.
+Checking moves and other turn bookkeeping is not in any phase.
+Profiles from different games or worker processes are combined with merge, like latency histograms."""
+
+
+class PhaseProfile:
+    def __init__(self):
+        "Total seconds and the number of timed calls for each phase."
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(PHASES, 0)
+        self.games = 0
+
+    def add(self, phase, seconds, count=1):
+        self.seconds[phase] += seconds
+        self.counts[phase] += count
+
+    def merge(self, other):
+        "Adds every phase timed by another profile to this one."
+        for phase in PHASES:
+            self.seconds[phase] += other.seconds[phase]
+            self.counts[phase] += other.counts[phase]
+        self.games += other.games
+
+    def get_bot_seconds(self):
+        return sum([self.seconds[phase] for phase in BOT_PHASES])
+
+    def get_engine_seconds(self):
+        return sum([self.seconds[phase] for phase in PHASES if phase not in BOT_PHASES])
+
+    def get_table(self):
+        "Returns lines with the calls, total and mean time of each phase, after a line comparing bot and engine time."
+        if not self.games:
+            return ["No games."]
+        lines = ["%s games. %.1f ms in the bot, %.1f ms in the game engine." % (
+            self.games, self.get_bot_seconds() * 1000, self.get_engine_seconds() * 1000)]
+        lines.append("%-12s %10s %12s %10s" % ("Phase", "Calls", "Total ms", "Mean us"))
+        for phase in PHASES:
+            count = self.counts[phase]
+            mean = self.seconds[phase] / count if count else 0
+            lines.append("%-12s %10s %12.2f %10.2f" % (phase, count, self.seconds[phase] * 1000, mean * 1e6))
+        return lines
@@ -0,0 +1,233 @@
+import os
+import struct
+from array import array
+
+from constants import *
+from game import Game
+from utilities import *
+
+"""This module stores finished games as compact binary records, about 200 bytes each.
+
+A record file starts with RECORD_MAGIC, followed by records that are each prefixed with
+their length as an unsigned 32 bit integer. A record holds the game seed, max_turns, the outcome,
+who moved first, both ship setups, both bot names and every shot in order. Shots alternate
+between players starting with the first mover, so each shot is a single byte: the cell
+index x*BOARD.HEIGHT+y, with the top bit set if it hit a ship.
+
+The human readable log is not stored. It is regenerated by replaying the record through
+Game with ReplayBots, which works because the seed decides everything else."""
+
+RECORD_MAGIC = b"BGR2"
+RECORD_EXTENSION = ".bgr"
+
+RECORD_HEADER = struct.Struct("<QIBB")
+"32 bits, since games with a high max_turns and bots that repeat shots can go past 65535 shots."
+LENGTH_PREFIX = struct.Struct("<I")
+SHOT_COUNT = struct.Struct("<I")
+HIT_FLAG = 0x80
+NO_PLAYER = 0xff
+
+
+class SETUP_STATUS:
+    OK = 0
+    CRASHED = 1
+    UNREADABLE = 2
+
+
+def pack_ship(ship):
+    "Packs a ship into 12 bits: length, x and y take 3, 4 and 4 bits, rotation takes 1."
+    ship_length, x, y, rotation = ship
+    return ship_length << 9 | x << 5 | y << 1 | (1 if rotation else 0)
+
+
+def unpack_ship(value):
+    return (value >> 9, (value >> 5) & 15, (value >> 1) & 15, bool(value & 1))
+
+
+def is_ship_packable(ship):
+    if not is_ship_valid(ship):
+        return False
+    ship_length, x, y, rotation = ship
+    return ship_length < 8 and x < 16 and y < 16
+
+
+def pack_text(text):
+    data = str(text).encode("utf-8")[:255]
+    return bytes([len(data)]) + data
+
+
+class GameRecord:
+    def __init__(self, seed, max_turns, outcome, first_player, setups, setup_statuses, names, shots):
+        self.seed = seed
+        self.max_turns = max_turns
+        self.outcome = outcome
+        self.first_player = first_player
+
+        "Per player: a list of ships, a SETUP_STATUS, and a (ship_name, commander_name) pair."
+        self.setups = setups
+        self.setup_statuses = setup_statuses
+        self.names = names
+
+        "A list of (player, x, y, hit) in the order they were fired."
+        self.shots = shots
+
+    def encode(self):
+        "Returns this record as bytes, without the length prefix."
+        first_player = NO_PLAYER if self.first_player < 0 else self.first_player
+        data = [RECORD_HEADER.pack(self.seed, self.max_turns, self.outcome, first_player)]
+        for player in range(2):
+            ships = self.setups[player] if self.setup_statuses[player] == SETUP_STATUS.OK else []
+            data.append(bytes([self.setup_statuses[player], len(ships)]))
+            data.append(struct.pack("<%sH" % len(ships), *[pack_ship(ship) for ship in ships]))
+            ship_name, commander_name = self.names[player]
+            data.append(pack_text(ship_name) + pack_text(commander_name))
+        data.append(SHOT_COUNT.pack(len(self.shots)))
+        data.append(bytes([(x * BOARD.HEIGHT + y) | (HIT_FLAG if hit else 0) for player, x, y, hit in self.shots]))
+        return b"".join(data)
+
+    def replay(self, verbose=False):
+        "Plays this game again with ReplayBots and returns the finished Game."
+        bots = (ReplayBot(self, 0), ReplayBot(self, 1))
+        return Game(bots[0], bots[1], verbose=verbose, max_turns=self.max_turns, seed=self.seed)
+
+    def get_log_text(self):
+        "Returns the human readable log for this game, as Game.write_log would have written it."
+        return "\n".join(self.replay().get_log_lines())
+
+
+class ReplayBot:
+    "A bot that repeats the setup and moves of one player from a GameRecord."
+    def __init__(self, record, player):
+        self.ship_name, self.commander_name = record.names[player]
+        self.setup = record.setups[player]
+        self.setup_status = record.setup_statuses[player]
+        self.moves = [(x, y) for shooter, x, y, hit in record.shots if shooter == player]
+        self.move_index = 0
+
+    def get_setup(self):
+        if self.setup_status == SETUP_STATUS.CRASHED:
+            raise RuntimeError("Ship setup crashed in the recorded game.")
+        return self.setup
+
+    def get_move(self, hits, shots):
+        if self.move_index >= len(self.moves):
+            raise RuntimeError("The recorded game has no more moves for this player.")
+        self.move_index += 1
+        return self.moves[self.move_index - 1]
+
+
+def decode_text(data, offset):
+    length = data[offset]
+    return data[offset + 1:offset + 1 + length].decode("utf-8", "replace"), offset + 1 + length
+
+
+def decode_game_record(data):
+    "Turns bytes from GameRecord.encode back into a GameRecord."
+    seed, max_turns, outcome, first_player = RECORD_HEADER.unpack_from(data, 0)
+    offset = RECORD_HEADER.size
+    setups = []
+    setup_statuses = []
+    names = []
+    for player in range(2):
+        status, ship_count = data[offset], data[offset + 1]
+        offset += 2
+        ships = [unpack_ship(value) for value in struct.unpack_from("<%sH" % ship_count, data, offset)]
+        offset += 2 * ship_count
+        ship_name, offset = decode_text(data, offset)
+        commander_name, offset = decode_text(data, offset)
+        setups.append(ships)
+        setup_statuses.append(status)
+        names.append((ship_name, commander_name))
+
+    shot_count = SHOT_COUNT.unpack_from(data, offset)[0]
+    offset += SHOT_COUNT.size
+    if first_player == NO_PLAYER:
+        first_player = -1
+    shots = []
+    for i, value in enumerate(data[offset:offset + shot_count]):
+        cell = value & ~HIT_FLAG
+        player = (first_player + i) % 2
+        shots.append((player, cell // BOARD.HEIGHT, cell % BOARD.HEIGHT, bool(value & HIT_FLAG)))
+    return GameRecord(seed, max_turns, outcome, first_player, setups, setup_statuses, names, shots)
+
+
+def get_game_record(game):
+    "Builds a GameRecord from a finished Game."
+    setups = []
+    setup_statuses = []
+    for player in range(2):
+        ships = game.setups[player]
+        if ships is None:
+            setups.append([])
+            setup_statuses.append(SETUP_STATUS.CRASHED)
+        elif type(ships) in (list, tuple) and all([is_ship_packable(ship) for ship in ships]):
+            setups.append([tuple(ship) for ship in ships])
+            setup_statuses.append(SETUP_STATUS.OK)
+        else:
+            setups.append([])
+            setup_statuses.append(SETUP_STATUS.UNREADABLE)
+
+    names = [(get_ship_name(bot), getattr(bot, "commander_name", "Unknown")) for bot in game.bots]
+    ships = [world.get_ships() for world in game.worlds]
+    shots = [(player, x, y, bool(ships[(player + 1) % 2][x][y])) for player, x, y in game.shot_history]
+    return GameRecord(game.seed, game.max_turns, game.outcome, game.first_player, setups, setup_statuses, names, shots)
+
+
+def create_record_file(path):
+    "Creates an empty record file at path."
+    with open(path, "wb") as f:
+        f.write(RECORD_MAGIC)
+
+
+"Record files opened by this process, keyed by path."
+record_files = {}
+
+
+def append_game_record(path, game):
+    """Appends a finished Game to the record file at path.
+    Each record is a single os.write to a file opened with O_APPEND, so worker processes can share one file."""
+    if path not in record_files:
+        record_files[path] = os.open(path, os.O_WRONLY | os.O_APPEND)
+    data = get_game_record(game).encode()
+    os.write(record_files[path], LENGTH_PREFIX.pack(len(data)) + data)
+
+
+def read_game_record_at(path, offset):
+    "Reads the single GameRecord whose length prefix starts at this byte offset, as listed in a log index."
+    with open(path, "rb") as f:
+        f.seek(offset)
+        length = LENGTH_PREFIX.unpack(f.read(LENGTH_PREFIX.size))[0]
+        return decode_game_record(f.read(length))
+
+
+def read_game_records(path):
+    "Yields every GameRecord in a record file, in the order they were written."
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(RECORD_MAGIC):
+        raise ValueError("Not a game record file: '%s'" % path)
+
+    offset = len(RECORD_MAGIC)
+    while offset + LENGTH_PREFIX.size <= len(data):
+        length = LENGTH_PREFIX.unpack_from(data, offset)[0]
+        offset += LENGTH_PREFIX.size
+        yield decode_game_record(data[offset:offset + length])
+        offset += length
+
+
+def get_record_heatmaps(path):
+    """Counts ship placements and shots per cell over every game in a record file.
+    Returns two flat arrays of BOARD.WIDTH*BOARD.HEIGHT counters, indexed by x*BOARD.HEIGHT+y."""
+    ship_counts = array("L", [0]) * (BOARD.WIDTH * BOARD.HEIGHT)
+    shot_counts = array("L", [0]) * (BOARD.WIDTH * BOARD.HEIGHT)
+    for record in read_game_records(path):
+        for player in range(2):
+            if record.setup_statuses[player] != SETUP_STATUS.OK:
+                continue
+            for ship in record.setups[player]:
+                for x, y in get_ship_coordinates(ship):
+                    if x < BOARD.WIDTH and y < BOARD.HEIGHT:
+                        ship_counts[x * BOARD.HEIGHT + y] += 1
+        for player, x, y, hit in record.shots:
+            shot_counts[x * BOARD.HEIGHT + y] += 1
+    return ship_counts, shot_counts
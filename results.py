@@ -0,0 +1,124 @@
+import json
+
+from constants import *
+from utilities import *
+
+"""This module writes a results file with one JSON line per finished game, while the games are played.
+
+Each line is a compact object like:
+    {"game":3,"seed":123,"bots":["SS Random","SS Sequential"],"paths":["bots/random.py","bots/sequential.py"],
+     "first":1,"outcome":"player2","winner":"SS Sequential","turns":171,"setup_ms":[0.01,0.01],"think_ms":[0.95,0.71],"max_move_ms":[0.03,0.02],"engine_ms":2.9}
+
+Lists hold player 1's value, then player 2's. "first" is the player index that moved first, or null if a setup failed.
+Lines are written as soon as games finish, so the file can be followed while a tournament runs.
+Games from worker processes come back in small batches, in the order they finish, so use "game" to sort them.
+"paths" are the bots' script paths, or null if they weren't given, since different bots can share a name.
+ResultsWriter also keeps running totals that take the same memory however many games are played."""
+
+OUTCOME_NAMES = {OUTCOMES.PLAYER1_WIN: "player1", OUTCOMES.PLAYER2_WIN: "player2",
+                 OUTCOMES.DRAW: "draw", OUTCOMES.IN_PROGRESS: "unfinished"}
+
+
+def get_milliseconds(seconds):
+    return round(seconds * 1000, 3)
+
+
+def get_game_row(game, game_index, paths=None):
+    "Returns the results row for a finished game, as a dictionary ready to be written as JSON."
+    names = [get_ship_name(bot) for bot in game.bots]
+    return dict(
+        game=game_index,
+        seed=game.seed,
+        bots=names,
+        paths=list(paths) if paths else None,
+        first=game.first_player if game.first_player >= 0 else None,
+        outcome=OUTCOME_NAMES.get(game.outcome, "unknown"),
+        winner=names[game.winner] if game.winner >= 0 else None,
+        turns=len(game.shot_history),
+        setup_ms=[get_milliseconds(profile.seconds[PHASE.SETUP]) for profile in game.phase_profiles],
+        think_ms=[get_milliseconds(profile.seconds[PHASE.THINK]) for profile in game.phase_profiles],
+        max_move_ms=[get_milliseconds(latencies.max) for latencies in game.move_latencies],
+        engine_ms=get_milliseconds(sum([profile.get_engine_seconds() for profile in game.phase_profiles])))
+
+
+class ResultsSummary:
+    "Running totals over results rows. Memory grows with the number of bots, not the number of games."
+
+    def __init__(self):
+        self.games = 0
+        self.draws = 0
+        self.turns = 0
+        self.min_turns = None
+        self.max_turns = 0
+
+        """Games, wins and total think milliseconds, and the bot's name, keyed by script path.
+        Rows without paths are keyed by bot name instead."""
+        self.bot_games = {}
+        self.bot_wins = {}
+        self.bot_think_ms = {}
+        self.bot_names = {}
+
+    def add(self, row):
+        self.games += 1
+        if row["outcome"] == "draw":
+            self.draws += 1
+        turns = row["turns"]
+        self.turns += turns
+        self.min_turns = turns if self.min_turns is None else min(self.min_turns, turns)
+        self.max_turns = max(self.max_turns, turns)
+        keys = row.get("paths") or row["bots"]
+        for key, name, think_ms in zip(keys, row["bots"], row["think_ms"]):
+            self.bot_names[key] = name
+            self.bot_games[key] = self.bot_games.get(key, 0) + 1
+            self.bot_think_ms[key] = self.bot_think_ms.get(key, 0) + think_ms
+        for player, outcome in enumerate(("player1", "player2")):
+            if row["outcome"] == outcome:
+                self.bot_wins[keys[player]] = self.bot_wins.get(keys[player], 0) + 1
+
+    def get_lines(self):
+        if not self.games:
+            return ["No games."]
+        lines = ["%s games, %s draws. Turns: mean %.1f, min %s, max %s." % (
+            self.games, self.draws, self.turns / self.games, self.min_turns, self.max_turns)]
+        names = list(self.bot_names.values())
+        for key in sorted(self.bot_games, key=lambda key: -self.bot_wins.get(key, 0)):
+            games = self.bot_games[key]
+            label = "'%s'" % self.bot_names[key]
+            if names.count(self.bot_names[key]) > 1:
+                "Bots sharing a name are told apart by their paths."
+                label += " (%s)" % key
+            lines.append("%s won %s/%s games, thinking %.3f ms per game." % (
+                label, self.bot_wins.get(key, 0), games, self.bot_think_ms[key] / games))
+        return lines
+
+
+class ResultsWriter:
+    """Appends rows to a results file as they arrive, and adds them to a ResultsSummary.
+    It has an append method like a list, so play_pairing can fill either one."""
+
+    def __init__(self, path):
+        self.path = path
+        "Line buffered, so every row reaches the file as soon as it is written."
+        self.file = open(path, "a", buffering=1)
+        self.summary = ResultsSummary()
+
+    def append(self, row):
+        self.file.write(json.dumps(row, separators=(",", ":")) + "\n")
+        self.summary.add(row)
+
+    def extend(self, rows):
+        "Appends a batch of rows, like a chunk of games from a worker, with one write."
+        self.file.write("".join([json.dumps(row, separators=(",", ":")) + "\n" for row in rows]))
+        for row in rows:
+            self.summary.add(row)
+
+    def close(self):
+        self.file.close()
+
+
+def read_result_rows(path):
+    "Yields the rows of a results file, one at a time."
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,230 @@
+import json
+import os
+import random
+import select
+import struct
+import subprocess
+import sys
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from constants import *
+from utilities import *
+
+"""This module runs a bot in its own long-lived process, so a bot that hangs, crashes or eats memory
+can only lose its own games.
+
+SandboxBot starts the process once and is then used like any other bot, for as many games as needed.
+The process is limited by rlimits: CPU seconds per call and total memory. If a call takes longer than
+the move or setup time limit, the process is killed and restarted for the next call, and the call
+raises TimeoutError, which Game treats like a crash.
+
+Messages are a MESSAGE_HEADER, an opcode and payload length, then the payload. A move request sends
+one byte per cell, in x*BOARD.HEIGHT+y order: 0 not shot, 1 missed, 2 hit, 3 hit and sunk.
+The reply is two signed 32 bit integers. Setups are sent as JSON, since bots may return anything.
+The bot's own prints go to stderr, because stdout carries the messages.
+
+Before every ship setup, the bot's global random module is seeded from the bot's game_seed, which Game
+sets from the game seed, and the bot gets the same game_seed attribute it would in-process. Sandboxed
+games are still repeatable, though their bots draw different numbers than they would in-process. Needs a POSIX system for select on pipes and rlimits."""
+
+MESSAGE_HEADER = struct.Struct("<BI")
+SEED = struct.Struct("<Q")
+MOVE = struct.Struct("<ii")
+
+"Seconds of CPU time a bot may use for one call, and megabytes of memory for its whole process."
+CPU_SECONDS = 10
+MEMORY_MB = 512
+
+"Seconds a bot script gets to load and build its bot."
+LOAD_TIME = 10
+
+
+class MESSAGE:
+    HELLO = 0
+    SETUP = 1
+    MOVE = 2
+    REPLY = 3
+    ERROR = 4
+
+
+"Lookup tables from a cell's byte in a move request to its hits and shots values."
+CELL_HITS = (0, 0, 1, 2)
+CELL_SHOTS = (0, 1, 1, 1)
+
+
+def encode_board(hits, shots):
+    return bytes([shot + hit for hits_column, shots_column in zip(hits, shots)
+                  for hit, shot in zip(hits_column, shots_column)])
+
+
+def decode_board(data):
+    "Returns (hits, shots) as tuple arrays from encode_board bytes."
+    columns = [data[x * BOARD.HEIGHT:(x + 1) * BOARD.HEIGHT] for x in range(BOARD.WIDTH)]
+    hits = tuple([tuple([CELL_HITS[value] for value in column]) for column in columns])
+    shots = tuple([tuple([CELL_SHOTS[value] for value in column]) for column in columns])
+    return hits, shots
+
+
+class SandboxBot:
+    "A bot running in a separate process. It has the same attributes and methods Game uses on any bot."
+
+    def __init__(self, path, move_time=None, setup_time=None, cpu_seconds=CPU_SECONDS, memory_mb=MEMORY_MB):
+        self.path = path
+        self.move_time = move_time
+        self.setup_time = setup_time
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.process = None
+        self.buffer = b""
+        "Set by Game before each ship setup, and passed on to the bot."
+        self.game_seed = None
+        self.start()
+
+    def start(self):
+        "Starts the bot process and reads its names. Raises an error if the bot can't be loaded."
+        command = [sys.executable, os.path.abspath(__file__), os.path.abspath(self.path),
+                   str(self.cpu_seconds), str(self.memory_mb)]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+        self.buffer = b""
+        try:
+            self.ship_name, self.commander_name = json.loads(self.read_reply(LOAD_TIME, "to load"))
+        except:
+            self.close()
+            raise
+
+    def close(self):
+        if self.process:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def __del__(self):
+        self.close()
+
+    def get_setup(self):
+        "Seeds the bot's random module from game_seed, or this process's random without one, then asks for its ship setup."
+        seed = random.getrandbits(64) if self.game_seed is None else self.game_seed
+        self.send(MESSAGE.SETUP, SEED.pack(seed))
+        ships = json.loads(self.read_reply(self.setup_time, "for its ship setup"))
+        if type(ships) is list:
+            "JSON turns tuples into lists. Turn ships back, so logs show them as the bot wrote them."
+            ships = [tuple(ship) if type(ship) is list else ship for ship in ships]
+        return ships
+
+    def get_move(self, hits, shots):
+        self.send(MESSAGE.MOVE, encode_board(hits, shots))
+        return MOVE.unpack(self.read_reply(self.move_time, "for its turn"))
+
+    def send(self, opcode, payload):
+        if not self.process:
+            self.start()
+        try:
+            self.process.stdin.write(MESSAGE_HEADER.pack(opcode, len(payload)) + payload)
+        except (BrokenPipeError, OSError):
+            self.close()
+            raise RuntimeError("The bot process for '%s' has stopped." % self.path)
+
+    def read_reply(self, timeout, action):
+        """Waits up to timeout seconds, or forever if None, for a reply and returns its payload.
+        Raises TimeoutError or RuntimeError, and stops the process, if there is no good reply."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        try:
+            opcode, length = MESSAGE_HEADER.unpack(self.read_exactly(MESSAGE_HEADER.size, deadline))
+            payload = self.read_exactly(length, deadline)
+        except TimeoutError:
+            self.close()
+            name = getattr(self, "ship_name", self.path)
+            raise TimeoutError("'%s' took longer than %s seconds %s." % (name, timeout, action))
+        except EOFError:
+            self.close()
+            raise RuntimeError("The bot process for '%s' stopped. It may have gone over its CPU or memory limit." % self.path)
+
+        if opcode == MESSAGE.ERROR:
+            raise RuntimeError("The bot raised an error:\n" + payload.decode("utf-8", "replace"))
+        return payload
+
+    def read_exactly(self, size, deadline):
+        fd = self.process.stdout.fileno()
+        while len(self.buffer) < size:
+            if deadline is not None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                    raise TimeoutError()
+            data = os.read(fd, 65536)
+            if not data:
+                raise EOFError()
+            self.buffer += data
+        data = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return data
+
+
+def limit_cpu(cpu_seconds):
+    "Lets this process use cpu_seconds more CPU time before the system stops it."
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_CPU)
+    limit = int(usage.ru_utime + usage.ru_stime) + cpu_seconds + 1
+    if hard_limit != resource.RLIM_INFINITY:
+        limit = min(limit, hard_limit)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard_limit))
+
+
+def run_bot_process(path, cpu_seconds, memory_mb):
+    "The bot process. Loads the bot, then answers requests on stdin until it closes."
+    reader = sys.stdin.buffer
+    writer = os.dup(1)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    def reply(opcode, payload):
+        os.write(writer, MESSAGE_HEADER.pack(opcode, len(payload)) + payload)
+
+    if resource:
+        memory = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        limit_cpu(cpu_seconds)
+
+    try:
+        bot = get_bot_from_path(path)
+        "SandboxBot has every bot method, so the parent can only tell a bot is missing one from here."
+        for a in BOT_ATTRIBUTES:
+            if a not in dir(bot):
+                raise AttributeError("Missing attribute or function: '%s'" % a)
+        reply(MESSAGE.HELLO, json.dumps([str(bot.ship_name), str(bot.commander_name)]).encode("utf-8"))
+    except:
+        reply(MESSAGE.ERROR, traceback.format_exc().encode("utf-8"))
+        return
+
+    while True:
+        header = reader.read(MESSAGE_HEADER.size)
+        if len(header) < MESSAGE_HEADER.size:
+            return
+        opcode, length = MESSAGE_HEADER.unpack(header)
+        payload = reader.read(length)
+        if resource:
+            limit_cpu(cpu_seconds)
+
+        try:
+            if opcode == MESSAGE.SETUP:
+                bot.game_seed = SEED.unpack(payload)[0]
+                random.seed(bot.game_seed)
+                reply(MESSAGE.REPLY, json.dumps(bot.get_setup()).encode("utf-8"))
+            elif opcode == MESSAGE.MOVE:
+                hits, shots = decode_board(payload)
+                x, y = bot.get_move(hits=hits, shots=shots)
+                assert type(x) is int and type(y) is int, "Moves must be two ints."
+                reply(MESSAGE.REPLY, MOVE.pack(x, y))
+            else:
+                raise ValueError("Unknown message: %s" % opcode)
+        except:
+            reply(MESSAGE.ERROR, traceback.format_exc().encode("utf-8"))
+
+
+if __name__ == "__main__":
+    run_bot_process(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]))
@@ -0,0 +1,9 @@
+"This bot loads but has no get_move, so it must fail validation in and out of the sandbox."
+
+class BattleshipBot():
+	def __init__(self):
+		self.ship_name="test bot"
+		self.commander_name="bobjoe"
+	
+	def get_setup(self):
+		return []
@@ -0,0 +1,14 @@
+from constants import *
+
+class BattleshipBot():
+    "A bot that never finishes its first move, to test time limits."
+    def __init__(self):
+        self.ship_name = "SS Slow"
+        self.commander_name = "Slow"
+
+    def get_setup(self):
+        return [(5, 2, 2, False), (4, 2, 4, False), (3, 2, 6, False), (3, 2, 8, False), (2, 7, 6, False)]
+
+    def get_move(self, hits, shots):
+        while True:
+            pass
@@ -0,0 +1,121 @@
+import unittest, random
+
+from world import World
+from ai_tools import *
+from constants import *
+
+class TestDensityMap(unittest.TestCase):
+    ships=((5,0,0,False),
+        (4,9,0,True),
+        (3,7,9,False),
+        (3,5,5,False),
+        (2,0,8,True))
+
+    def test_misses(self):
+        "With only misses, every cell counts the placements that avoid them, once per ship of that length."
+        world=World(10,10)
+        world.set_ships(self.ships)
+        for x,y in ((3,3),(6,2),(1,7)):
+            world.shoot(x,y)
+        density_map=DensityMap()
+        density_map.update(world.get_hits(),world.get_shots())
+
+        for x in range(BOARD.WIDTH):
+            for y in range(BOARD.HEIGHT):
+                expected=0
+                for ship_length in BOARD.SHIP_LENGTHS:
+                    for placement in get_placement_index().by_length[ship_length]:
+                        if (x,y) in placement.coordinates and not any([(3,3) in placement.coordinates,(6,2) in placement.coordinates,(1,7) in placement.coordinates]):
+                            expected+=1
+                self.assertEqual(density_map.get_density(x,y),expected)
+
+    def test_incremental(self):
+        "Updating after every shot ends in the same state as one update with the final boards."
+        world=World(10,10)
+        world.set_ships(self.ships)
+        step_map=DensityMap()
+        cells=[(x,y) for x in range(10) for y in range(10)]
+        random.Random(2).shuffle(cells)
+        for x,y in cells[:60]:
+            world.shoot(x,y)
+            step_map.update(world.get_hits(),world.get_shots())
+        final_map=DensityMap()
+        final_map.update(world.get_hits(),world.get_shots())
+        self.assertEqual(step_map.totals,final_map.totals)
+        self.assertEqual(step_map.remaining,final_map.remaining)
+
+    def test_sinking(self):
+        world=World(10,10)
+        world.set_ships(self.ships)
+        density_map=DensityMap()
+        for x,y in ((0,8),(0,9)):
+            world.shoot(x,y)
+            density_map.update(world.get_hits(),world.get_shots())
+        self.assertEqual(density_map.remaining[2],0)
+        self.assertEqual(density_map.get_density(1,8),0)
+        self.assertEqual(density_map.get_density(0,7),0)
+
+    def test_plays_game(self):
+        "Following get_best_move sinks every ship without shooting a cell twice, then a new game resets the map."
+        density_map=DensityMap()
+        for game in range(2):
+            world=World(10,10)
+            world.set_ships(self.ships)
+            for turn in range(100):
+                density_map.update(world.get_hits(),world.get_shots())
+                x,y=density_map.get_best_move()
+                self.assertFalse(world.get_shots()[x][y])
+                world.shoot(x,y)
+                if not world.is_navy_alive():
+                    break
+            self.assertFalse(world.is_navy_alive())
+            density_map.update(world.get_hits(),world.get_shots())
+            self.assertFalse(any(density_map.remaining.values()))
+
+class TestFleetGenerator(unittest.TestCase):
+    def test_legal_fleets(self):
+        "every fleet is legal, in World and in are_ships_valid, which also rejects the corners"
+        for biased in (False,True):
+            fleets=list(FleetGenerator(random.Random(1),biased=biased).iter_fleets(300))
+            self.assertEqual(len(fleets),300)
+            for fleet in fleets:
+                self.assertTrue(World(10,10).set_ships(fleet),msg=str(fleet))
+                self.assertTrue(are_ships_valid(fleet),msg=str(fleet))
+            self.assertGreater(len(set(map(tuple,fleets))),290)
+            
+    def test_repeatable(self):
+        self.assertEqual(FleetGenerator(random.Random(5)).get_fleet(),FleetGenerator(random.Random(5)).get_fleet())
+        random.seed(7)
+        fleet=get_random_fleet()
+        random.seed(7)
+        self.assertEqual(get_random_fleet(),fleet)
+        
+    def test_no_room(self):
+        "draw gives up when no placement fits, so get_fleet starts the fleet again instead of looping forever"
+        generator=FleetGenerator(random.Random(2),biased=True)
+        full=generator.choices[0][0]
+        self.assertIsNone(generator.draw(generator.choices[1],(1<<100)-1))
+        self.assertIsNotNone(generator.draw(generator.choices[1],full[1]))
+
+    def get_edge_share(self,fleets):
+        "the share of ship cells on the board's outer rows and columns"
+        cells=[cell for fleet in fleets for ship in fleet for cell in get_ship_coordinates(ship)]
+        return len([1 for x,y in cells if x in (0,9) or y in (0,9)])/len(cells)
+
+    def test_distribution(self):
+        """compares both modes with the plainest uniform sampler: every ship drawn from all its placements,
+        keeping fleets World accepts. Biased fleets are known to sit about 16% less on the edges"""
+        rng=random.Random(3)
+        placements=[[(length,x,y,rotation) for x in range(10) for y in range(10) for rotation in (False,True)
+                     if is_ship_in_world((length,x,y,rotation))] for length in BOARD.SHIP_LENGTHS]
+        fleets=[]
+        while len(fleets)<3000:
+            fleet=[rng.choice(ships) for ships in placements]
+            if World(10,10).set_ships(fleet):
+                fleets.append(fleet)
+        uniform=self.get_edge_share(fleets)
+        exact=self.get_edge_share(FleetGenerator(random.Random(4)).iter_fleets(5000))
+        biased=self.get_edge_share(FleetGenerator(random.Random(4),biased=True).iter_fleets(5000))
+        self.assertAlmostEqual(exact,uniform,delta=0.01)
+        self.assertLess(biased,uniform*0.9)
+        self.assertGreater(biased,uniform*0.8)
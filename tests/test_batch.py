@@ -0,0 +1,63 @@
+import unittest
+
+from game import Game
+from batch import *
+from utilities import *
+from constants import *
+
+from bots.sequential import BattleshipBot as OCDBot
+from bots.random import BattleshipBot as RandoBot
+
+class BatchOCDBot(OCDBot):
+    "Shoots the same cells as OCDBot, for a whole batch of boards at once."
+    def get_moves(self, hits_batch, shots_batch):
+        "OCDBot scans row by row, so flatten each board in (y,x) order and take the first unshot cell."
+        rows=shots_batch.transpose(0,2,1).reshape(len(shots_batch),-1)
+        cells=rows.argmin(axis=1)
+        return numpy.stack([cells%BOARD.WIDTH,cells//BOARD.WIDTH],axis=1)
+
+class BadSetupBot(OCDBot):
+    def get_setup(self):
+        return [(5,0,0,False)]
+
+@unittest.skipIf(numpy is None,"NumPy is not installed")
+class TestBatch(unittest.TestCase):
+    def assert_matches_games(self,bot1,bot2,game_count,max_turns):
+        result=play_batch(bot1,bot2,game_count,max_turns=max_turns,master_seed=9)
+        for i in range(game_count):
+            game=Game(bot1,bot2,max_turns=max_turns,seed=get_game_seed(9,i))
+            self.assertEqual(result.outcomes[i],game.outcome,msg="game %s"%i)
+            self.assertEqual(result.turns[i],game.round_counter,msg="game %s"%i)
+            self.assertEqual(result.first_players[i],game.first_player,msg="game %s"%i)
+        return result
+    
+    def test_matches_game(self):
+        self.assert_matches_games(BatchOCDBot(),OCDBot(),20,1000)
+        
+    def test_draws(self):
+        result=self.assert_matches_games(BatchOCDBot(),BatchOCDBot(),10,50)
+        self.assertEqual(result.get_counts(),(0,0,10))
+        
+    def test_bad_setup_and_bad_moves(self):
+        self.assert_matches_games(BadSetupBot(),OCDBot(),4,100)
+        result=play_batch(RandoBot(),OCDBot(),10,master_seed=1)
+        self.assertEqual(sum(result.get_counts()),10)
+        
+        class OutsideBot(OCDBot):
+            def get_moves(self,hits_batch,shots_batch):
+                return numpy.full((len(hits_batch),2),BOARD.WIDTH)
+        result=play_batch(OutsideBot(),OCDBot(),6)
+        self.assertEqual(result.get_counts(),(0,6,0))
+        
+    def test_bot_moves_not_changed(self):
+        "bad moves are zeroed in a copy, never in the array the bot returned and may keep"
+        class KeepingBot(OCDBot):
+            def get_moves(self,hits_batch,shots_batch):
+                self.moves=numpy.array([[BOARD.WIDTH,0],[1,2]])
+                return self.moves
+        bot=KeepingBot()
+        boards=numpy.zeros((2,BOARD.WIDTH,BOARD.HEIGHT),dtype=numpy.int8)
+        moves,crashed=get_moves(bot,boards,boards)
+        self.assertEqual(moves.tolist(),[[0,0],[1,2]])
+        self.assertEqual(crashed.tolist(),[True,False])
+        self.assertEqual(bot.moves.tolist(),[[BOARD.WIDTH,0],[1,2]])
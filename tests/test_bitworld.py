@@ -0,0 +1,51 @@
+import unittest, random
+
+from world import World
+from bitworld import BitWorld
+from utilities import *
+from constants import *
+
+class TestBitWorld(unittest.TestCase):
+    ships=((5,0,0,False),
+        (4,9,0,True),
+        (3,7,9,False),
+        (3,5,5,False),
+        (2,0,8,True))
+    
+    def test_matches_world(self):
+        "Shoot every cell in a random order and compare against the list backed World."
+        world=World(10,10)
+        bit_world=BitWorld(10,10)
+        self.assertTrue(world.set_ships(self.ships))
+        self.assertTrue(bit_world.set_ships(self.ships))
+        
+        cells=[(x,y) for x in range(10) for y in range(10)]
+        random.Random(5).shuffle(cells)
+        for x,y in cells:
+            world.shoot(x,y)
+            bit_world.shoot(x,y)
+            self.assertEqual(world.get_hits(),bit_world.get_hits())
+            self.assertEqual(world.get_shots(),bit_world.get_shots())
+            self.assertEqual(world.is_ship_sunk(x,y),bit_world.is_ship_sunk(x,y))
+            self.assertEqual(world.is_navy_alive(),bit_world.is_navy_alive())
+        self.assertEqual(world.to_string(),bit_world.to_string())
+        self.assertEqual(world.sunk_shots,bit_world.sunk_shots)
+        
+    def test_touching_and_overlap(self):
+        world=BitWorld(10,10)
+        self.assertTrue(world.set_ship((3,2,2,False)))
+        "touching below"
+        self.assertFalse(world.set_ship((2,2,3,False)))
+        "overlapping"
+        self.assertFalse(world.set_ship((2,3,1,True)))
+        "diagonal is allowed"
+        self.assertTrue(world.set_ship((2,5,3,True)))
+        "no wrapping between columns"
+        self.assertTrue(world.set_ship((2,0,9,False)))
+        self.assertTrue(world.set_ship((2,1,0,True)))
+        
+    def test_outside(self):
+        world=BitWorld(10,10)
+        self.assertFalse(world.set_ship((4,8,0,False)))
+        self.assertFalse(world.set_ship((4,0,8,True)))
+        self.assertFalse(world.is_navy_alive())
@@ -0,0 +1,55 @@
+import unittest, os, tempfile, contextlib, io
+
+import battleship
+import utilities
+from docopt import docopt, DocoptExit
+
+class TestCLI(unittest.TestCase):
+    def test_fast_args_match_docopt(self):
+        "the fast parser gives exactly what docopt gives, or leaves the command line to docopt"
+        command_lines=(["match","a.py","b.py"],
+            ["match","a.py","b.py","--rounds=3","--logging","--bitboard","--seed=7"],
+            ["robin","bots","--workers=2","--move-time=0.5","--sandbox","--profile"],
+            ["benchmark","bots","--log-format=text","--results=results.jsonl"],
+            ["heatmap","logs"],
+            ["replay","logs/game-00001.bgr","--game=2"],
+            ["perf","--output=perf.json","--baseline=old.json","--tolerance=5"],
+            ["test"])
+        for argv in command_lines:
+            self.assertEqual(battleship.get_fast_args(argv),docopt(battleship.__doc__,argv=argv))
+        
+    def test_fast_args_fallback(self):
+        for argv in ([],["--help"],["match","a.py"],["test","--rounds=2"],["match","a.py","b.py","--rounds"],
+                     ["match","a.py","b.py","--rounds","3"],["match","a.py","b.py","--logging=yes"],["match","a.py","b.py","--unknown"]):
+            self.assertIsNone(battleship.get_fast_args(argv))
+
+    def test_folder_bots_stale_cache(self):
+        "a cached script that no longer imports is dropped with a message and forgotten, instead of stopping the run"
+        cache_path=utilities.VALIDATION_CACHE_PATH
+        with tempfile.TemporaryDirectory() as folder:
+            utilities.VALIDATION_CACHE_PATH=os.path.join(folder,"validation.json")
+            utilities._valid_script_hashes=None
+            try:
+                bots_folder=os.path.join(folder,"bots")
+                os.mkdir(bots_folder)
+                with open("tests/bot_valid.py") as f:
+                    script=f.read()
+                with open(os.path.join(bots_folder,"good.py"),"w") as f:
+                    f.write(script)
+                stale=os.path.join(bots_folder,"stale.py")
+                with open(stale,"w") as f:
+                    f.write("from ai_tools import renamed_function\n"+script)
+                key=utilities.get_validation_cache_key(stale)
+                utilities.remember_valid_script(key)
+                
+                output=io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    paths,bots=battleship.get_folder_bots(bots_folder,False,None)
+                self.assertEqual([os.path.basename(path) for path in paths],["good.py"])
+                self.assertEqual(len(bots),1)
+                self.assertIn("Script failed to import: '%s'"%stale,output.getvalue())
+                utilities._valid_script_hashes=None
+                self.assertNotIn(key,utilities.get_valid_script_hashes())
+            finally:
+                utilities.VALIDATION_CACHE_PATH=cache_path
+                utilities._valid_script_hashes=None
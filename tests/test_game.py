@@ -0,0 +1,108 @@
+import unittest
+
+from game import Game
+from world import World
+from utilities import *
+from constants import *
+
+from bots.sequential import BattleshipBot as OCDBot
+
+class TestGame(unittest.TestCase):
+    def test_lazy_log_boards(self):
+        game=Game(OCDBot(),OCDBot())
+        self.assertNotEqual(game.outcome,OUTCOMES.IN_PROGRESS)
+        
+        "board snapshots are stored unrendered"
+        snapshots=[entry for entry in game.log_entries if type(entry) is not str]
+        self.assertEqual(len(snapshots),game.round_counter)
+        
+        lines=game.get_log_lines()
+        self.assertEqual(len(lines),len(game.log_entries))
+        boards=[line for line in lines if line.startswith("Round ")]
+        self.assertEqual(len(boards),game.round_counter)
+        self.assertNotIn("O",boards[0])
+        self.assertIn("O",boards[-1])
+        
+        "the last snapshot was taken before the winning shot"
+        worlds=(World(BOARD.WIDTH,BOARD.HEIGHT),World(BOARD.WIDTH,BOARD.HEIGHT))
+        for player in range(2):
+            worlds[player].set_ships(game.setups[player])
+        for player,x,y in game.shot_history[:-1]:
+            worlds[(player+1)%2].shoot(x,y)
+        self.assertIn(worlds[0].to_string(other_world=worlds[1]),boards[-1])
+
+    def test_seed_replays_game(self):
+        from bots.random import BattleshipBot as RandoBot
+        games=[Game(RandoBot(),RandoBot(),seed=42) for i in range(2)]
+        self.assertEqual(games[0].get_log_lines(),games[1].get_log_lines())
+        self.assertEqual(games[0].shot_history,games[1].shot_history)
+        
+        "the seed is derived from the master seed and game index only"
+        self.assertEqual(get_game_seed(3,10),get_game_seed(3,10))
+        self.assertNotEqual(get_game_seed(3,10),get_game_seed(3,11))
+        self.assertNotEqual(get_game_seed(3,10),get_game_seed(4,10))
+
+    def test_first_player_independent(self):
+        "the first mover comes from its own sub-seed, so bots can't predict it from their own draws"
+        import random
+        class GuessingBot(OCDBot):
+            def get_setup(self):
+                self.guess=random.randint(0,1)
+                return OCDBot.get_setup(self)
+        matches=0
+        game_seeds=set()
+        for seed in range(200):
+            bot1,bot2=GuessingBot(),OCDBot()
+            game=Game(bot1,bot2,seed=seed,max_turns=1)
+            matches+=bot1.guess==game.first_player
+            game_seeds.add(bot1.game_seed)
+            self.assertNotEqual(bot1.game_seed,bot2.game_seed)
+            self.assertNotEqual(bot1.game_seed,seed)
+        self.assertGreater(matches,60)
+        self.assertLess(matches,140)
+        self.assertEqual(len(game_seeds),200)
+
+    def test_time_limits(self):
+        import time
+        class SlowBot(OCDBot):
+            def get_move(self, hits, shots):
+                time.sleep(0.02)
+                return OCDBot.get_move(self, hits, shots)
+        
+        game=Game(SlowBot(),OCDBot(),move_time=0.01)
+        self.assertEqual(game.outcome,OUTCOMES.PLAYER2_WIN)
+        self.assertIn("over the 0.01 second limit",game.get_log_lines()[-2])
+        self.assertEqual(game.move_latencies[0].count,1)
+        
+        "both bots shoot the same cells, so the one that moves first wins. Player 2 moves first with seed 0"
+        game=Game(SlowBot(),OCDBot(),move_time=1,seed=0)
+        self.assertEqual(game.first_player,1)
+        self.assertEqual(game.outcome,OUTCOMES.PLAYER2_WIN)
+        self.assertGreater(game.move_latencies[0].get_percentile(50),0.015)
+        self.assertEqual(game.move_latencies[1].count,len([s for s in game.shot_history if s[0]==1]))
+
+    def test_phase_profiles(self):
+        "every turn is counted in each phase for the player who took it, along with the game's setup"
+        game=Game(OCDBot(),OCDBot())
+        for player in range(2):
+            profile=game.phase_profiles[player]
+            turns=len([s for s in game.shot_history if s[0]==player])
+            self.assertEqual(profile.games,1)
+            self.assertEqual(profile.counts[PHASE.SETUP],1)
+            self.assertEqual(profile.counts[PHASE.VALIDATION],1)
+            for phase in (PHASE.SNAPSHOT,PHASE.THINK,PHASE.SHOOT):
+                self.assertEqual(profile.counts[phase],turns)
+            self.assertEqual(profile.seconds[PHASE.THINK],game.move_latencies[player].total)
+            self.assertGreater(profile.get_engine_seconds(),0)
+
+    def test_logging_phase(self):
+        "logging counts only the log calls, not checking moves, which are slowed down here"
+        import time
+        class SlowCheckWorld(World):
+            def is_in_bounds(self, x, y):
+                time.sleep(0.001)
+                return World.is_in_bounds(self, x, y)
+        game=Game(OCDBot(),OCDBot(),world_class=SlowCheckWorld,max_turns=20,seed=0)
+        logging=sum([profile.seconds[PHASE.LOGGING] for profile in game.phase_profiles])
+        self.assertGreater(logging,0)
+        self.assertLess(logging,0.005)
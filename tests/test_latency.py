@@ -0,0 +1,31 @@
+import unittest
+
+from latency import *
+
+class TestLatency(unittest.TestCase):
+    def test_percentiles(self):
+        histogram=LatencyHistogram()
+        for i in range(1,101):
+            histogram.add(i/1000)
+        self.assertEqual(histogram.count,100)
+        self.assertEqual(histogram.max,0.1)
+        
+        "percentiles are accurate to within one bucket"
+        self.assertLessEqual(abs(histogram.get_percentile(50)-0.05),0.05*0.2)
+        self.assertLessEqual(abs(histogram.get_percentile(99)-0.099),0.099*0.2)
+        self.assertEqual(histogram.get_percentile(100),0.1)
+        self.assertEqual(LatencyHistogram().get_percentile(50),0)
+        
+    def test_merge(self):
+        "merging histograms counts the same as adding every time to one"
+        times=[0.0000001,0.00002,0.0003,0.004,0.05,0.6]
+        whole=LatencyHistogram()
+        halves=(LatencyHistogram(),LatencyHistogram())
+        for i,seconds in enumerate(times):
+            whole.add(seconds)
+            halves[i%2].add(seconds)
+        halves[0].merge(halves[1])
+        self.assertEqual(halves[0].counts,whole.counts)
+        self.assertEqual(halves[0].count,whole.count)
+        self.assertEqual(halves[0].max,whole.max)
+        self.assertEqual(halves[0].get_summary(),whole.get_summary())
@@ -0,0 +1,83 @@
+import unittest, os, tempfile
+
+from game import Game
+from logwriter import *
+from records import *
+from constants import *
+
+from bots.random import BattleshipBot as RandoBot
+from bots.sequential import BattleshipBot as OCDBot
+
+class TestLogWriter(unittest.TestCase):
+    def setUp(self):
+        self.cwd=os.getcwd()
+        self.folder=tempfile.TemporaryDirectory()
+        os.chdir(self.folder.name)
+        
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.folder.cleanup()
+        
+    def test_binary_index(self):
+        logger=GameLogger(LOG_FORMAT.BINARY,"indexed")
+        games=[Game(RandoBot(),OCDBot(),seed=i) for i in range(5)]
+        for game in games:
+            logger.write(game)
+        logger.close()
+        
+        self.assertEqual([record.seed for record in read_game_records(logger.path)],list(range(5)))
+        index=read_log_index(logger.index_path)
+        "every game is written once but indexed under both orderings"
+        self.assertEqual(index["ssrandom-versus-sssequential"],index["sssequential-versus-ssrandom"])
+        offsets=index["ssrandom-versus-sssequential"]
+        self.assertEqual(len(offsets),5)
+        self.assertEqual([read_game_record_at(logger.path,offset).seed for offset in offsets],list(range(5)))
+        
+    def test_text_written_once(self):
+        logger=GameLogger(LOG_FORMAT.TEXT,"indexed")
+        game=Game(RandoBot(),OCDBot(),seed=1)
+        logger.write(game)
+        logger.flush()
+        logger.close()
+        
+        index=read_log_index(logger.index_path)
+        path=index["sssequential-versus-ssrandom"][0]
+        self.assertEqual(index["ssrandom-versus-sssequential"],[path])
+        with open(path) as f:
+            self.assertEqual(f.read(),"\n".join(game.get_log_lines()))
+        self.assertEqual(len([name for name in os.listdir("logs") if name.endswith(".log")]),1)
+
+    def test_write_error_raised(self):
+        "a writer thread that can't open its files must not leave flush waiting forever"
+        logger=GameLogger(LOG_FORMAT.BINARY,"broken")
+        logger.index_path=os.path.join("missing","broken.idx")
+        logger.write(Game(RandoBot(),OCDBot(),seed=1))
+        self.assertRaises(OSError,logger.flush)
+        self.assertRaises(OSError,logger.close)
+
+    def test_index_not_shared(self):
+        "a binary run after a text run with the same label gets its own index, not the text run's"
+        text_logger=GameLogger(LOG_FORMAT.TEXT,"robin")
+        binary_logger=GameLogger(LOG_FORMAT.BINARY,"robin")
+        self.assertNotEqual(binary_logger.index_path,text_logger.index_path)
+        self.assertEqual(binary_logger.index_path,binary_logger.path[:-len(RECORD_EXTENSION)]+INDEX_EXTENSION)
+        for logger in (text_logger,binary_logger):
+            logger.write(Game(RandoBot(),OCDBot(),seed=1))
+            logger.close()
+        self.assertEqual(read_log_index(text_logger.index_path)["ssrandom-versus-sssequential"][0][-4:],".log")
+        self.assertIsInstance(read_log_index(binary_logger.index_path)["ssrandom-versus-sssequential"][0],int)
+        "the record number given back is not left behind as an empty file"
+        self.assertEqual(len([name for name in os.listdir("logs") if name.endswith(RECORD_EXTENSION)]),1)
+
+    def test_short_write(self):
+        "a record batch that is only partly written raises, instead of indexing offsets that point at the wrong place"
+        from unittest import mock
+        logger=GameLogger(LOG_FORMAT.BINARY,"short")
+        record=get_game_record(Game(RandoBot(),OCDBot(),seed=1)).encode()
+        write=os.write
+        fd=os.open(logger.path,os.O_WRONLY|os.O_APPEND)
+        try:
+            with mock.patch("os.write",lambda fd,data: write(fd,data[:len(data)//2])):
+                self.assertRaises(OSError,logger.write_records,fd,[(("a","b"),record)])
+        finally:
+            os.close(fd)
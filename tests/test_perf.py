@@ -0,0 +1,36 @@
+import unittest, os, tempfile
+
+from perf import *
+
+class TestPerf(unittest.TestCase):
+    def test_run_benchmarks(self):
+        "every benchmark is timed, and setups build fresh state for each run"
+        worlds=[]
+        benchmarks=[Benchmark("shoot",lambda world:world.shoot(0,0),lambda:worlds.append(World(10,10)) or worlds[-1],unit="shot"),
+                    Benchmark("coordinates",lambda state:get_ship_coordinates(SHIPS[0]),operations=1)]
+        results=run_benchmarks(benchmarks,batch_seconds=0.001,repeats=2)
+        self.assertEqual(set(results["benchmarks"]),{"shoot","coordinates"})
+        self.assertEqual(results["benchmarks"]["shoot"]["unit"],"shot")
+        for result in results["benchmarks"].values():
+            self.assertGreater(result["seconds"],0)
+        self.assertEqual(len(worlds),len(set(map(id,worlds))))
+        
+    def test_engine_benchmarks(self):
+        "the engine benchmarks all run without errors"
+        for benchmark in get_engine_benchmarks():
+            state=benchmark.setup() if benchmark.setup else None
+            benchmark.run(state)
+            
+    def test_compare(self):
+        results=dict(benchmarks=dict(a=dict(seconds=1.2),b=dict(seconds=1.05),c=dict(seconds=0.5),new=dict(seconds=1)))
+        baseline=dict(benchmarks=dict(a=dict(seconds=1.0),b=dict(seconds=1.0),c=dict(seconds=1.0),old=dict(seconds=1)))
+        comparison=compare_results(results,baseline,tolerance_percent=10)
+        self.assertEqual(set(comparison),{"a","b","c"})
+        self.assertTrue(comparison["a"]["regression"])
+        self.assertFalse(comparison["b"]["regression"])
+        self.assertEqual(comparison["c"]["change_percent"],-50)
+        
+        with tempfile.TemporaryDirectory() as folder:
+            path=os.path.join(folder,"perf.json")
+            write_results(path,results)
+            self.assertEqual(read_results(path),results)
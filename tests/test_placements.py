@@ -0,0 +1,52 @@
+import unittest
+
+from placements import *
+from utilities import *
+from constants import *
+
+class TestPlacements(unittest.TestCase):
+    def test_index(self):
+        "Every placement that fits on the board is indexed, with masks matching its coordinates."
+        for ship_length in set(BOARD.SHIP_LENGTHS):
+            self.assertEqual(len(get_placement_index().by_length[ship_length]),2*BOARD.HEIGHT*(BOARD.WIDTH-ship_length+1))
+        for placement in get_placement_index().placements:
+            self.assertEqual([list(c) for c in placement.coordinates],get_ship_coordinates(placement.ship))
+            mask=0
+            for x,y in placement.coordinates:
+                mask|=1<<(x*BOARD.HEIGHT+y)
+            self.assertEqual(placement.mask,mask)
+            self.assertFalse(placement.mask & placement.neighbour_mask)
+
+    def test_neighbour_mask(self):
+        placement=get_placement((2,0,0,False))
+        expected=0
+        for x,y in ((0,1),(1,1),(2,0)):
+            expected|=1<<(x*BOARD.HEIGHT+y)
+        self.assertEqual(placement.neighbour_mask,expected)
+
+    def test_get_placement(self):
+        self.assertTrue(get_placement((3,2,2,False)))
+        self.assertTrue(get_placement([3,2,2,1]))
+        self.assertEqual(get_placement((3,2,2,1)),get_placement((3,2,2,True)))
+        self.assertIsNone(get_placement((3,8,2,False)))
+        self.assertIsNone(get_placement((3,2,8,True)))
+        self.assertIsNone(get_placement((7,0,0,False)))
+        self.assertIsNone(get_placement((3.0,2,2,False)))
+        self.assertIsNone(get_placement((3,2,2,"yes")))
+        self.assertIsNone(get_placement((3,2,2)))
+
+    def test_in_world(self):
+        self.assertTrue(is_ship_in_world((5,2,0,False)))
+        self.assertFalse(is_ship_in_world((5,1,0,False)))
+        self.assertFalse(is_ship_in_world((5,6,0,False)))
+        self.assertFalse(is_ship_in_world((5,0,0,True)))
+        self.assertFalse(is_ship_in_world((4,7,5,False)))
+        self.assertTrue(is_ship_in_world((7,2,4,False)))
+
+    def test_overlap_and_touch(self):
+        self.assertFalse(do_ships_overlap(((5,0,0,False),(4,0,2,False))))
+        self.assertFalse(do_ships_touch(((5,0,0,False),(4,0,2,False))))
+        self.assertFalse(do_ships_overlap(((5,0,0,False),(4,0,1,False))))
+        self.assertTrue(do_ships_touch(((5,0,0,False),(4,0,1,False))))
+        self.assertTrue(do_ships_overlap(((5,0,0,False),(4,4,0,True))))
+        self.assertTrue(do_ships_touch(((3,0,0,False),(3,0,0,False))))
@@ -0,0 +1,30 @@
+import unittest
+
+from profiling import *
+from constants import *
+
+class TestProfiling(unittest.TestCase):
+    def test_merge(self):
+        profile=PhaseProfile()
+        profile.games=1
+        profile.add(PHASE.THINK,0.5)
+        profile.add(PHASE.SHOOT,0.25,10)
+        other=PhaseProfile()
+        other.games=2
+        other.add(PHASE.THINK,1.0)
+        other.add(PHASE.SETUP,0.25)
+        profile.merge(other)
+        self.assertEqual(profile.games,3)
+        self.assertEqual(profile.counts[PHASE.THINK],2)
+        self.assertEqual(profile.counts[PHASE.SHOOT],10)
+        self.assertEqual(profile.get_bot_seconds(),1.75)
+        self.assertEqual(profile.get_engine_seconds(),0.25)
+
+    def test_table(self):
+        self.assertEqual(PhaseProfile().get_table(),["No games."])
+        profile=PhaseProfile()
+        profile.games=1
+        profile.add(PHASE.SNAPSHOT,0.002,4)
+        lines=profile.get_table()
+        self.assertEqual(len(lines),2+len(PHASES))
+        self.assertIn("500.00",[line for line in lines if line.startswith(PHASE.SNAPSHOT)][0])
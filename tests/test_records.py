@@ -0,0 +1,81 @@
+import unittest, os, tempfile
+
+from game import Game
+from records import *
+from utilities import *
+from constants import *
+
+from bots.random import BattleshipBot as RandoBot
+from bots.sequential import BattleshipBot as OCDBot
+
+class CrashBot(OCDBot):
+    def get_move(self, hits, shots):
+        if sum([sum(column) for column in shots])>10:
+            raise ValueError("crash")
+        return OCDBot.get_move(self,hits,shots)
+
+class TestRecords(unittest.TestCase):
+    def test_pack_ship(self):
+        for ship in ((5,0,0,False),(2,9,9,True),(3,4,7,True)):
+            self.assertEqual(unpack_ship(pack_ship(ship)),ship)
+    
+    def test_roundtrip(self):
+        for bots in ((RandoBot(),OCDBot()),(OCDBot(),CrashBot())):
+            game=Game(bots[0],bots[1],seed=12,max_turns=250)
+            data=get_game_record(game).encode()
+            self.assertLess(len(data),300)
+            
+            record=decode_game_record(data)
+            self.assertEqual(record.seed,12)
+            self.assertEqual(record.outcome,game.outcome)
+            self.assertEqual(record.first_player,game.first_player)
+            self.assertEqual([(player,x,y) for player,x,y,hit in record.shots],game.shot_history)
+            self.assertEqual(record.replay().outcome,game.outcome)
+    
+    def test_log_text_matches_game(self):
+        game=Game(RandoBot(),OCDBot(),seed=3,max_turns=80)
+        self.assertEqual(game.outcome,OUTCOMES.DRAW)
+        record=decode_game_record(get_game_record(game).encode())
+        self.assertEqual(record.get_log_text(),"\n".join(game.get_log_lines()))
+    
+    def test_record_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path=os.path.join(folder,"games"+RECORD_EXTENSION)
+            create_record_file(path)
+            games=[Game(RandoBot(),OCDBot(),seed=i) for i in range(3)]
+            for game in games:
+                append_game_record(path,game)
+            records=list(read_game_records(path))
+            self.assertEqual([record.seed for record in records],[0,1,2])
+            self.assertEqual(records[2].names[1],("SS Sequential","Sequential"))
+    
+    def test_long_game(self):
+        "games past 65535 shots still encode, like two bots repeating a miss with a high max_turns"
+        game=Game(RandoBot(),OCDBot(),seed=5)
+        record=get_game_record(game)
+        record.max_turns=70000
+        record.shots=[((game.first_player+i)%2,0,0,False) for i in range(70000)]
+        with tempfile.TemporaryDirectory() as folder:
+            path=os.path.join(folder,"games"+RECORD_EXTENSION)
+            create_record_file(path)
+            with open(path,"ab") as f:
+                data=record.encode()
+                f.write(LENGTH_PREFIX.pack(len(data))+data)
+            records=list(read_game_records(path))
+        self.assertEqual(len(records),1)
+        self.assertEqual(len(records[0].shots),70000)
+        self.assertEqual(records[0].shots[-1],((game.first_player+1)%2,0,0,False))
+
+    def test_record_heatmaps(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path=os.path.join(folder,"games"+RECORD_EXTENSION)
+            create_record_file(path)
+            games=[Game(RandoBot(),OCDBot(),seed=i) for i in range(4)]
+            for game in games:
+                append_game_record(path,game)
+            ship_counts,shot_counts=get_record_heatmaps(path)
+            
+            "both players place the same fleet in every game"
+            self.assertEqual(sum(ship_counts),4*2*sum(BOARD.SHIP_LENGTHS))
+            self.assertEqual(ship_counts[2*BOARD.HEIGHT+2],8)
+            self.assertEqual(sum(shot_counts),sum([len(game.shot_history) for game in games]))
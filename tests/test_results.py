@@ -0,0 +1,52 @@
+import unittest, os, tempfile, json
+
+from game import Game
+from results import *
+from constants import *
+
+from bots.sequential import BattleshipBot as OCDBot
+
+class TestResults(unittest.TestCase):
+    def test_game_row(self):
+        game=Game(OCDBot(),OCDBot(),seed=4)
+        row=get_game_row(game,7)
+        self.assertEqual((row["game"],row["seed"],row["first"]),(7,4,game.first_player))
+        self.assertEqual(row["outcome"],OUTCOME_NAMES[game.outcome])
+        self.assertEqual(row["winner"],"SS Sequential")
+        self.assertEqual(row["turns"],len(game.shot_history))
+        self.assertEqual(len(row["think_ms"]),2)
+        "rows are plain JSON"
+        self.assertEqual(json.loads(json.dumps(row)),row)
+        
+    def test_writer(self):
+        "rows are written as they arrive, and the running totals match them"
+        rows=[get_game_row(Game(OCDBot(),OCDBot(),seed=seed),seed) for seed in range(4)]
+        with tempfile.TemporaryDirectory() as folder:
+            path=os.path.join(folder,"results.jsonl")
+            writer=ResultsWriter(path)
+            writer.append(rows[0])
+            self.assertEqual(list(read_result_rows(path)),rows[:1])
+            writer.extend(rows[1:])
+            writer.close()
+            self.assertEqual(list(read_result_rows(path)),rows)
+        
+        summary=writer.summary
+        self.assertEqual(summary.games,4)
+        self.assertEqual(summary.bot_games["SS Sequential"],8)
+        self.assertEqual(summary.bot_wins["SS Sequential"],4)
+        self.assertEqual(summary.min_turns,min([row["turns"] for row in rows]))
+        self.assertEqual(len(summary.get_lines()),2)
+        self.assertEqual(ResultsSummary().get_lines(),["No games."])
+
+    def test_summary_by_path(self):
+        "bots with the same name but different scripts are counted apart"
+        game=Game(OCDBot(),OCDBot(),seed=1)
+        summary=ResultsSummary()
+        summary.add(get_game_row(game,0,("a/sequential.py","b/sequential.py")))
+        summary.add(get_game_row(game,1,("a/sequential.py","c/sequential.py")))
+        self.assertEqual(summary.bot_games,{"a/sequential.py":2,"b/sequential.py":1,"c/sequential.py":1})
+        self.assertEqual(sum(summary.bot_wins.values()),2)
+        self.assertEqual(summary.bot_wins.get("a/sequential.py",0),2 if game.winner==0 else 0)
+        lines=summary.get_lines()
+        self.assertEqual(len(lines),4)
+        self.assertTrue(any([line.startswith("'SS Sequential' (a/sequential.py) won") for line in lines]))
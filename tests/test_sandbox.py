@@ -0,0 +1,64 @@
+import unittest, os
+
+from game import Game
+from sandbox import *
+from utilities import *
+from constants import *
+
+@unittest.skipIf(os.name!="posix","The sandbox needs a POSIX system")
+class TestSandbox(unittest.TestCase):
+    def test_board_encoding(self):
+        hits=tuple([tuple([(x+y)%3 if (x*y)%2 else 0 for y in range(BOARD.HEIGHT)]) for x in range(BOARD.WIDTH)])
+        shots=tuple([tuple([1 if hits[x][y] or y%3==0 else 0 for y in range(BOARD.HEIGHT)]) for x in range(BOARD.WIDTH)])
+        data=encode_board(hits,shots)
+        self.assertEqual(len(data),BOARD.WIDTH*BOARD.HEIGHT)
+        self.assertEqual(decode_board(data),(hits,shots))
+        
+    def test_matches_in_process(self):
+        "sequential ignores random, so the sandboxed bot must play exactly like the in-process one"
+        "the opponent must ignore random too, since seeding the sandbox draws from this process's random"
+        sandbox_bot=SandboxBot("bots/sequential.py")
+        self.assertEqual(sandbox_bot.ship_name,"SS Sequential")
+        for seed in range(3):
+            games=[Game(bot,get_bot_from_path("bots/sequential.py"),seed=seed) for bot in (sandbox_bot,get_bot_from_path("bots/sequential.py"))]
+            self.assertEqual(games[0].shot_history,games[1].shot_history)
+            self.assertEqual(games[0].get_log_lines(),games[1].get_log_lines())
+        sandbox_bot.close()
+        
+    def test_seeded(self):
+        "sandboxed random bots repeat their games for the same game seed"
+        sandbox_bot=SandboxBot("bots/random.py")
+        games=[Game(sandbox_bot,get_bot_from_path("bots/sequential.py"),seed=9) for i in range(2)]
+        self.assertEqual(games[0].shot_history,games[1].shot_history)
+        sandbox_bot.close()
+        
+    def test_time_limit(self):
+        "a bot that never answers loses, and its process is restarted for the next game"
+        sandbox_bot=SandboxBot("tests/bot_slow.py",move_time=0.1)
+        for seed in range(2):
+            game=Game(sandbox_bot,get_bot_from_path("bots/sequential.py"),seed=seed)
+            self.assertEqual(game.outcome,OUTCOMES.PLAYER2_WIN)
+            self.assertIn("took longer than 0.1 seconds",game.get_log_lines()[-2])
+        self.assertEqual(game.move_latencies[0].count,1)
+        
+    def test_cpu_limit(self):
+        "without a time limit, the CPU limit stops the bot"
+        sandbox_bot=SandboxBot("tests/bot_slow.py",cpu_seconds=1)
+        sandbox_bot.get_setup()
+        with self.assertRaises(RuntimeError):
+            sandbox_bot.get_move(((0,)*BOARD.HEIGHT,)*BOARD.WIDTH,((0,)*BOARD.HEIGHT,)*BOARD.WIDTH)
+
+    def test_missing_method(self):
+        "SandboxBot has every bot method, so the bot process itself must refuse a bot without get_move"
+        with self.assertRaises(RuntimeError) as context:
+            SandboxBot("tests/bot_no_move.py")
+        self.assertIn("get_move",str(context.exception))
+        self.assertFalse(is_valid_script("tests/bot_no_move.py",loader=lambda path: get_bot(path,{})))
+        
+    def test_match_load_error(self):
+        "a sandboxed bot that fails to load stops the match without a traceback, like an in-process one"
+        import battleship, contextlib, io
+        output=io.StringIO()
+        with contextlib.redirect_stdout(output):
+            battleship.run_match("tests/bot_no_move.py","bots/random.py",1,0,100,False,False,sandbox_options={})
+        self.assertIn("Cannot setup match",output.getvalue())
@@ -0,0 +1,101 @@
+import unittest, os, tempfile, threading
+
+from tournament import *
+from constants import *
+from utilities import *
+from records import read_game_records
+from logwriter import GameLogger
+
+def play_counted_task(task):
+    "runs a task like a pool worker would, then counts this worker's threads and open files"
+    play_pairing_task(task)
+    return os.getpid(),threading.active_count(),len(os.listdir("/proc/self/fd"))
+
+class TestTournament(unittest.TestCase):
+    def test_split_rounds(self):
+        self.assertEqual(split_rounds(10,3),[3,3,3,1])
+        self.assertEqual(split_rounds(9,3),[3,3,3])
+        self.assertEqual(split_rounds(2,5),[2])
+        self.assertEqual(sum(split_rounds(1000,get_chunk_size(1000,7))),1000)
+        "results rows come back with every chunk, so chunks stay small when they are collected"
+        self.assertEqual(get_chunk_size(100000,2),12500)
+        self.assertEqual(get_chunk_size(100000,2,True),ROWS_CHUNK_SIZE)
+        self.assertEqual(get_chunk_size(40,2,True),5)
+        
+    def test_parallel_pairings(self):
+        paths=["bots/sequential.py","bots/random.py"]
+        pairs=[(0,1),(1,0)]
+        game_options=dict(max_turns=250)
+        results=play_pairings_parallel(paths,pairs,6,game_options,None,1,2)
+        self.assertEqual(results,[(6,0,0),(0,6,0)])
+        
+    def test_serial_matches_parallel(self):
+        "random bots depend only on the game seeds, so both runs must agree"
+        paths=["bots/random.py","bots/random.py"]
+        pairs=[(0,1),(1,0)]
+        game_options=dict(max_turns=1000)
+        bots=[get_bot_from_path(path) for path in paths]
+        serial=play_pairings_serial(bots,pairs,10,game_options,None,3)
+        parallel=play_pairings_parallel(paths,pairs,10,game_options,None,3,2)
+        self.assertEqual(serial,parallel)
+        
+    def test_latencies(self):
+        "every move is counted once for the bot that made it, whether games run here or in workers"
+        paths=["bots/random.py","bots/sequential.py"]
+        pairs=[(0,1),(1,0)]
+        game_options=dict(max_turns=1000)
+        bots=[get_bot_from_path(path) for path in paths]
+        serial=[LatencyHistogram(),LatencyHistogram()]
+        parallel=[LatencyHistogram(),LatencyHistogram()]
+        play_pairings_serial(bots,pairs,5,game_options,None,3,serial)
+        play_pairings_parallel(paths,pairs,5,game_options,None,3,2,parallel)
+        self.assertGreater(serial[0].count,0)
+        self.assertEqual([h.count for h in serial],[h.count for h in parallel])
+
+    def test_profiles(self):
+        "phase profiles count the same calls for each bot, whether games run here or in workers"
+        paths=["bots/random.py","bots/sequential.py"]
+        pairs=[(0,1),(1,0)]
+        game_options=dict(max_turns=1000)
+        bots=[get_bot_from_path(path) for path in paths]
+        serial=[PhaseProfile(),PhaseProfile()]
+        parallel=[PhaseProfile(),PhaseProfile()]
+        play_pairings_serial(bots,pairs,5,game_options,None,3,profiles=serial)
+        play_pairings_parallel(paths,pairs,5,game_options,None,3,2,profiles=parallel)
+        self.assertEqual([p.games for p in serial],[10,10])
+        self.assertEqual([p.counts for p in serial],[p.counts for p in parallel])
+
+    def test_rows(self):
+        "workers send back the same results rows as games played here, one per game"
+        paths=["bots/random.py","bots/sequential.py"]
+        pairs=[(0,1),(1,0)]
+        game_options=dict(max_turns=1000)
+        bots=[get_bot_from_path(path) for path in paths]
+        serial=[]
+        parallel=[]
+        play_pairings_serial(bots,pairs,5,game_options,None,3,rows=serial)
+        play_pairings_parallel(paths,pairs,5,game_options,None,3,2,rows=parallel)
+        def get_key(row):
+            return row["game"],row["seed"],row["bots"],row["outcome"],row["turns"]
+        self.assertEqual([row["game"] for row in serial],list(range(10)))
+        self.assertEqual(sorted(map(get_key,serial)),sorted(map(get_key,parallel)))
+
+    @unittest.skipUnless(os.path.isdir("/proc/self/fd"),"needs /proc to count open files")
+    def test_worker_logger_reused(self):
+        "each worker keeps one logger, so threads and open files don't grow with the number of tasks"
+        cwd=os.getcwd()
+        folder=tempfile.TemporaryDirectory()
+        os.chdir(folder.name)
+        try:
+            logger=GameLogger(LOG_FORMAT.BINARY,"tasks")
+            paths=[os.path.join(cwd,"bots/random.py"),os.path.join(cwd,"bots/sequential.py")]
+            tasks=[(0,paths[0],paths[1],1,dict(max_turns=1000),logger,1,i,None,False) for i in range(12)]
+            counts={}
+            for pid,threads,fds in run_tasks(play_counted_task,tasks,2):
+                counts.setdefault(pid,set()).add((threads,fds))
+            for pid in counts:
+                self.assertEqual(len(counts[pid]),1)
+            self.assertEqual(len(list(read_game_records(logger.path))),12)
+        finally:
+            os.chdir(cwd)
+            folder.cleanup()
@@ -1,8 +1,24 @@
-import unittest
+import unittest, os, tempfile
 
+import utilities
 from utilities import *
 from constants import *
 
+"validation results are cached in a temporary folder, so test runs never skip checks or write into the checkout"
+cache_folder=None
+cache_path=utilities.VALIDATION_CACHE_PATH
+
+def setUpModule():
+    global cache_folder
+    cache_folder=tempfile.TemporaryDirectory()
+    utilities.VALIDATION_CACHE_PATH=os.path.join(cache_folder.name,"validation.json")
+    utilities._valid_script_hashes=None
+
+def tearDownModule():
+    utilities.VALIDATION_CACHE_PATH=cache_path
+    utilities._valid_script_hashes=None
+    cache_folder.cleanup()
+
 class TestUtilities(unittest.TestCase):
     
     def test_script_safe(self):
@@ -70,6 +86,137 @@ class TestUtilities(unittest.TestCase):
         result=get_ship_coordinates(ship)
         expected=[[1,1],[1,2],[1,3],[1,4]]
         self.assertEqual(result,expected)
+    
+    def test_check_fleet(self):
+        ships=((5,0,0,False),(4,9,0,True),(3,7,9,False),(3,5,5,False),(2,0,8,True))
+        error,ship_cells=check_fleet(ships)
+        self.assertIsNone(error)
+        self.assertEqual([list(map(list,coordinates)) for coordinates,mask in ship_cells],[get_ship_coordinates(ship) for ship in ships])
+        
+        def get_reason(ships,**options):
+            return check_fleet(ships,**options)[0].reason
+        self.assertEqual(get_reason(None),SHIPS_ERROR.BASIC_TYPE)
+        self.assertEqual(get_reason(ships[:4]),SHIPS_ERROR.COUNT)
+        self.assertEqual(get_reason(ships[:4]+((2,0,8,"yes"),)),SHIPS_ERROR.INVALID)
+        self.assertEqual(get_reason(ships[:4]+((7,0,8,True),)),SHIPS_ERROR.LENGTH)
+        self.assertEqual(get_reason(ships[:4]+((3,0,7,True),)),SHIPS_ERROR.DUPLICATE_LENGTH)
+        self.assertEqual(get_reason(ships[:4]+((2,0,9,True),)),SHIPS_ERROR.OUTSIDE)
+        self.assertEqual(get_reason(ships[:4]+((2,0,8,True),),width=5,height=5),SHIPS_ERROR.OUTSIDE)
         
+        error=check_fleet(ships[:4]+((2,5,4,True),))[0]
+        self.assertEqual((error.reason,error.ship,error.cell),(SHIPS_ERROR.OVERLAPPING,(2,5,4,True),(5,5)))
+        self.assertIn("(x,y)=(5, 5)",str(error))
+        self.assertEqual(get_reason(ships[:4]+((2,5,6,True),)),SHIPS_ERROR.TOUCHING)
+        self.assertIsNone(check_fleet(ships[:4]+((2,5,6,True),),check_touching=False)[0])
         
-        
\ No newline at end of file
+        "with no lengths, any ships are allowed, and occupied_mask holds ships placed before"
+        self.assertIsNone(check_fleet(((1,3,3,False),),lengths=None)[0])
+        self.assertEqual(get_reason(((1,3,3,False),),lengths=None,occupied_mask=1<<(3*10+4)),SHIPS_ERROR.TOUCHING)
+        
+    def test_touching_message(self):
+        self.assertFalse(get_touching_ships_message(((3,0,0,False),(3,0,2,False))))
+        self.assertFalse(get_touching_ships_message(((3,0,0,False),(3,3,1,False))))
+        self.assertIn("(x,y)=(0, 1)",get_touching_ships_message(((3,0,0,False),(3,0,1,False))))
+        self.assertTrue(get_touching_ships_message(((3,0,0,False),(3,3,0,False))))
+        
+    def test_next_log_path(self):
+        cwd=os.getcwd()
+        with tempfile.TemporaryDirectory() as folder:
+            os.chdir(folder)
+            try:
+                os.makedirs("logs")
+                open(os.path.join("logs","counted-00007.log"),"w").close()
+                first=get_next_log_path(label="counted")
+                second=get_next_log_path(label="counted")
+                self.assertEqual(first,os.path.join("logs","counted-00008.log"))
+                self.assertEqual(second,os.path.join("logs","counted-00009.log"))
+                self.assertTrue(os.path.isfile(second))
+                
+                "a file claimed by another process is skipped"
+                open(os.path.join("logs","counted-00010.log"),"w").close()
+                self.assertEqual(get_next_log_path(label="counted"),os.path.join("logs","counted-00011.log"))
+            finally:
+                os.chdir(cwd)
+
+    def test_bot_module_cache(self):
+        "each script is imported once, and again only when it changes"
+        with tempfile.TemporaryDirectory() as folder:
+            path=os.path.join(folder,"bot.py")
+            with open("tests/bot_valid.py") as f:
+                script=f.read()
+            with open(path,"w") as f:
+                f.write(script)
+            
+            bots=[get_bot_from_path(path) for i in range(2)]
+            self.assertIsNot(bots[0],bots[1])
+            self.assertIs(type(bots[0]),type(bots[1]))
+            self.assertTrue(is_valid_script(path))
+            self.assertIs(type(get_bot_from_path(path)),type(bots[0]))
+            
+            stat=os.stat(path)
+            os.utime(path,ns=(stat.st_atime_ns,stat.st_mtime_ns+10**9))
+            self.assertIsNot(type(get_bot_from_path(path)),type(bots[0]))
+
+    def test_validation_cache(self):
+        "scripts that passed are not checked again in later runs, until they change"
+        import json
+        cwd=os.getcwd()
+        with open("tests/bot_valid.py") as f:
+            script=f.read()
+        is_script_safe=utilities.is_script_safe
+        with tempfile.TemporaryDirectory() as folder:
+            os.chdir(folder)
+            utilities._valid_script_hashes=None
+            try:
+                with open("bot.py","w") as f:
+                    f.write(script)
+                self.assertTrue(is_valid_script("bot.py"))
+                self.assertTrue(os.path.isfile(utilities.VALIDATION_CACHE_PATH))
+                
+                "a new run reads the cache file and skips the checks"
+                utilities._valid_script_hashes=None
+                def fail(path,verbose=False):
+                    raise AssertionError("validated again")
+                utilities.is_script_safe=fail
+                self.assertTrue(is_valid_script("bot.py"))
+                
+                "passing in this process doesn't pass a sandbox loader, which checks the script once itself"
+                utilities.is_script_safe=is_script_safe
+                loads=[]
+                def loader(path):
+                    loads.append(path)
+                    return get_bot_from_path(path)
+                loader.cache_kind="sandbox"
+                self.assertTrue(is_valid_script("bot.py",loader=loader))
+                self.assertTrue(is_valid_script("bot.py",loader=loader))
+                self.assertEqual(loads,["bot.py"])
+                utilities.is_script_safe=fail
+                
+                with open("bot.py","a") as f:
+                    f.write("\n# changed\n")
+                with self.assertRaises(AssertionError):
+                    is_valid_script("bot.py")
+                utilities.is_script_safe=is_script_safe
+                
+                "a cache from another version is ignored"
+                with open(utilities.VALIDATION_CACHE_PATH,"w") as f:
+                    json.dump({"version":"old","valid":[get_script_hash("bot.py")]},f)
+                utilities._valid_script_hashes=None
+                self.assertEqual(get_valid_script_hashes(),set())
+            finally:
+                utilities.is_script_safe=is_script_safe
+                utilities._valid_script_hashes=None
+                os.chdir(cwd)
+
+    def test_validation_cache_modules(self):
+        "changing a module bots can import, like ai_tools, changes the cache version"
+        import shutil
+        with tempfile.TemporaryDirectory() as folder:
+            for name in ("constants","utilities","ai_tools","placements"):
+                shutil.copy(name+".py",folder)
+            before=get_modules_hash(folder)
+            self.assertEqual(before,get_modules_hash(os.getcwd()))
+            with open(os.path.join(folder,"ai_tools.py"),"a") as f:
+                f.write("\n# changed\n")
+            self.assertNotEqual(get_modules_hash(folder),before)
+        self.assertTrue(get_validation_cache_version().startswith(VALIDATION_CACHE_VERSION+"-"))
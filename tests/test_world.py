@@ -306,5 +306,75 @@ class TestUtilities(unittest.TestCase):
         self.assertFalse(do_ships_touch(ships))
         
         
+    
+    def test_health_counters(self):
+        world=World(10,10)
+        ships=((5,0,0,False),
+            (4,9,0,True),
+            (3,7,9,False),
+            (3,5,5,False),
+            (2,0,8,True))
+        world.set_ships(ships)
+        self.assertEqual(world.remaining_cells,sum(BOARD.SHIP_LENGTHS))
+        
+        "shooting the same cell twice only counts once"
+        world.shoot(0,8)
+        world.shoot(0,8)
+        self.assertEqual(world.remaining_cells,sum(BOARD.SHIP_LENGTHS)-1)
+        self.assertFalse(world.is_ship_sunk(0,9))
+        
+        world.shoot(0,9)
+        self.assertTrue(world.is_ship_sunk(0,8))
+        self.assertEqual(world.get_hits()[0][9],2)
+        
+        "water shots do not change the counters"
+        world.shoot(4,4)
+        self.assertEqual(world.remaining_cells,sum(BOARD.SHIP_LENGTHS)-2)
+        self.assertTrue(world.is_navy_alive())
+    
+    def test_cached_views(self):
+        world=World(10,10)
+        world.set_ship((3,5,5,False))
+        hits=world.get_hits()
+        shots=world.get_shots()
+        
+        "reading twice without shooting returns the same objects"
+        self.assertIs(hits,world.get_hits())
+        self.assertIs(shots,world.get_shots())
+        
+        "shooting only rebuilds the column that was shot"
+        world.shoot(6,5)
+        new_hits=world.get_hits()
+        new_shots=world.get_shots()
+        self.assertIsNot(hits,new_hits)
+        self.assertIs(hits[0],new_hits[0])
+        self.assertIs(shots[0],new_shots[0])
+        self.assertEqual(new_hits[6][5],1)
+        self.assertEqual(new_shots[6][5],1)
+        "old views are not changed"
+        self.assertEqual(hits[6][5],0)
+        self.assertEqual(shots[6][5],0)
+        
+    def test_set_ships_atomic(self):
+        "a rejected fleet leaves the world empty and says why in ships_error"
+        world=World(10,10)
+        ships=((5,0,0,False),
+            (4,9,0,True),
+            (3,7,9,False),
+            (3,5,5,False),
+            (2,5,6,True))
+        self.assertFalse(world.set_ships(ships))
+        self.assertEqual(world.ships_error.reason,SHIPS_ERROR.TOUCHING)
+        self.assertEqual(world.ships_error.ship,(2,5,6,True))
+        self.assertEqual(world.ships_error.cell,(5,5))
+        self.assertFalse(world.is_navy_alive())
+        self.assertFalse(any([any(column) for column in world.get_ships()]))
+        
+        "touching is allowed by is_ships_valid, but overlapping is not"
+        self.assertTrue(world.is_ships_valid(ships))
+        self.assertFalse(world.is_ships_valid(ships[:4]+((2,5,5,True),)))
         
-        
\ No newline at end of file
+        ships=ships[:4]+((2,0,8,True),)
+        self.assertTrue(world.set_ships(ships))
+        self.assertIsNone(world.ships_error)
+        self.assertEqual(world.remaining_cells,sum(BOARD.SHIP_LENGTHS))
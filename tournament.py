@@ -0,0 +1,175 @@
+import multiprocessing
+
+from constants import *
+from game import Game
+from latency import LatencyHistogram
+from profiling import PhaseProfile
+from results import get_game_row
+from utilities import *
+
+"""This module plays batches of games, either in this process or spread across a pool of worker processes."""
+
+"Bots loaded by this worker process, keyed by script path."
+worker_bots = {}
+
+
+def get_worker_bot(path, sandbox_options=None):
+    """Returns the bot for this script path, loading it only once per worker process.
+    With sandbox_options, the bot runs in its own process, started by this worker and reused for every game."""
+    if path not in worker_bots:
+        worker_bots[path] = get_bot(path, sandbox_options)
+    return worker_bots[path]
+
+
+"Loggers used by this worker process, keyed by index path."
+worker_loggers = {}
+
+
+def get_worker_logger(logger):
+    """Returns this worker process's copy of logger. Every task gets a freshly pickled copy,
+    so only the first is kept and used, and the worker runs one writer thread per logger, not one per task."""
+    return worker_loggers.setdefault(logger.index_path, logger)
+
+
+def split_rounds(rounds, chunk_size):
+    "Splits rounds into a list of chunk sizes, each no bigger than chunk_size."
+    chunks = [chunk_size] * (rounds // chunk_size)
+    if rounds % chunk_size:
+        chunks.append(rounds % chunk_size)
+    return chunks
+
+
+"""Games in a chunk at most when workers send back results rows, so rows reach the results file soon after
+their games finish, and workers hold only a few of them at a time."""
+ROWS_CHUNK_SIZE = 100
+
+
+def get_chunk_size(game_count, workers, collect_rows=False):
+    """Picks a chunk size that gives every worker a few chunks, so slow pairings don't leave workers idle.
+    With collect_rows, chunks are no bigger than ROWS_CHUNK_SIZE."""
+    chunk_size = max(1, game_count // (workers * 4))
+    if collect_rows:
+        chunk_size = min(chunk_size, ROWS_CHUNK_SIZE)
+    return chunk_size
+
+
+def play_pairing(bot1, bot2, rounds, game_options, logger, master_seed, first_index, latencies=None, profiles=None,
+                 rows=None, paths=None):
+    """Plays rounds games between bot1 and bot2. Returns (bot1 wins, bot2 wins, draws).
+    The games use the seeds for game indexes first_index, first_index+1, and so on.
+    If latencies is a pair of LatencyHistograms, each bot's move times are merged into its one.
+    If profiles is a pair of PhaseProfiles, each bot's side of the games is merged into its one,
+    including the bot's half of the time to queue each game's log.
+    If rows is a list, or a ResultsWriter, a results row for every game is appended to it,
+    with the bots' script paths if paths is given."""
+    bot1_wins = 0
+    bot2_wins = 0
+    draws = 0
+    for i in range(rounds):
+        seed = get_game_seed(master_seed, first_index + i)
+        game = Game(bot1, bot2, seed=seed, **game_options)
+        if logger:
+            logger.write(game)
+        if latencies:
+            for player in range(2):
+                latencies[player].merge(game.move_latencies[player])
+        if profiles:
+            for player in range(2):
+                profiles[player].merge(game.phase_profiles[player])
+        if rows is not None:
+            rows.append(get_game_row(game, first_index + i, paths))
+
+        if game.outcome == OUTCOMES.PLAYER1_WIN:
+            bot1_wins += 1
+        elif game.outcome == OUTCOMES.PLAYER2_WIN:
+            bot2_wins += 1
+        else:
+            draws += 1
+    return bot1_wins, bot2_wins, draws
+
+
+def play_pairing_task(task):
+    """Worker process entry point for play_pairing. Returns the task key with the results, both bots' move latencies
+    and phase profiles, and a list of results rows if the task asks for them, or None."""
+    key, path1, path2, rounds, game_options, logger, master_seed, first_index, sandbox_options, collect_rows = task
+    bot1 = get_worker_bot(path1, sandbox_options)
+    bot2 = get_worker_bot(path2, sandbox_options)
+    if logger:
+        logger = get_worker_logger(logger)
+    latencies = (LatencyHistogram(), LatencyHistogram())
+    profiles = (PhaseProfile(), PhaseProfile())
+    rows = [] if collect_rows else None
+    results = play_pairing(bot1, bot2, rounds, game_options, logger, master_seed, first_index, latencies, profiles, rows,
+                           (path1, path2))
+    if logger:
+        "The pool may stop this worker once results are returned, so logs can't be left in the buffer."
+        logger.flush()
+    return key, results, latencies, profiles, rows
+
+
+def run_tasks(function, tasks, workers):
+    "Runs function on every task in a pool of worker processes, yielding results as they finish."
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(function, tasks):
+            yield result
+
+
+def play_pairings_streaming(paths, pairs, rounds, game_options, logger, master_seed, workers, latencies=None,
+                            sandbox_options=None, profiles=None, rows=None):
+    """Plays rounds games for every (index1, index2) pair of bot paths across worker processes.
+    Yields (pair index, (bot1 wins, bot2 wins, draws)) as soon as all games for a pair are done.
+    Game indexes, and so seeds, match play_pairings_serial.
+    If latencies is a list of LatencyHistograms, one per path, move times are merged into them.
+    Phase times are merged the same way if profiles is a list of PhaseProfiles.
+    If rows is given, workers send back a results row for each game with every chunk, and they are added to rows.
+    Chunks are then kept small, so rows arrive while the run goes on.
+    If sandbox_options is given, workers run bots in SandboxBots with these options."""
+    chunk_size = get_chunk_size(len(pairs) * rounds, workers, rows is not None)
+    tasks = []
+    remaining_chunks = [0 for pair in pairs]
+    for pair_index, (i, j) in enumerate(pairs):
+        first_index = pair_index * rounds
+        for chunk in split_rounds(rounds, chunk_size):
+            tasks.append((pair_index, paths[i], paths[j], chunk, game_options, logger, master_seed, first_index,
+                          sandbox_options, rows is not None))
+            first_index += chunk
+            remaining_chunks[pair_index] += 1
+
+    results = [[0, 0, 0] for pair in pairs]
+    for pair_index, counts, pair_latencies, pair_profiles, pair_rows in run_tasks(play_pairing_task, tasks, workers):
+        if latencies:
+            for player, bot_index in enumerate(pairs[pair_index]):
+                latencies[bot_index].merge(pair_latencies[player])
+        if profiles:
+            for player, bot_index in enumerate(pairs[pair_index]):
+                profiles[bot_index].merge(pair_profiles[player])
+        if rows is not None:
+            rows.extend(pair_rows)
+        for k in range(3):
+            results[pair_index][k] += counts[k]
+        remaining_chunks[pair_index] -= 1
+        if not remaining_chunks[pair_index]:
+            yield pair_index, tuple(results[pair_index])
+
+
+def play_pairings_parallel(paths, pairs, rounds, game_options, logger, master_seed, workers, latencies=None,
+                           sandbox_options=None, profiles=None, rows=None):
+    """Plays rounds games for every (index1, index2) pair of bot paths across worker processes.
+    Returns a list of (bot1 wins, bot2 wins, draws), in the same order as pairs."""
+    results = [None for pair in pairs]
+    for pair_index, counts in play_pairings_streaming(paths, pairs, rounds, game_options, logger, master_seed, workers,
+                                                      latencies, sandbox_options, profiles, rows):
+        results[pair_index] = counts
+    return results
+
+
+def play_pairings_serial(bots, pairs, rounds, game_options, logger, master_seed, latencies=None, profiles=None, rows=None,
+                         paths=None):
+    """Plays rounds games for every (index1, index2) pair of bots in this process.
+    Pair number p plays game indexes p*rounds to p*rounds+rounds-1.
+    paths, if given, are the bots' script paths, for the results rows."""
+    return [play_pairing(bots[i], bots[j], rounds, game_options, logger, master_seed, pair_index * rounds,
+                         (latencies[i], latencies[j]) if latencies else None,
+                         (profiles[i], profiles[j]) if profiles else None, rows,
+                         (paths[i], paths[j]) if paths else None)
+            for pair_index, (i, j) in enumerate(pairs)]
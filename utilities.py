@@ -1,26 +1,54 @@
-import importlib.util
 import os
+import random
 import os.path
-import re
 import sys
-import traceback
 import copy
-import string
 
 from constants import *
+from placements import get_placement, get_placement_index, is_length_indexed
 
-def get_next_log_path(label="game"):
+"""Modules only some commands need, like re, traceback, string and importlib, are imported inside
+the functions that use them, so short runs like 'match' start faster."""
+
+"The next log number to try for each (label, extension), so the logs folder is only listed once per label."
+log_counters = {}
+
+def get_next_log_path(label="game", extension=".log"):
+    """Returns a new log path like 'logs/game-00001.log', creating the empty file to claim it.
+    Numbers come from an in memory counter. The file is created with O_EXCL, so parallel
+    processes sharing the folder skip past numbers another process already claimed."""
     folder = "logs"
-    if not os.path.isdir(folder):
-        os.makedirs(folder)
 
     def get_path(i):
-        return "logs" + os.sep + label+"-%s.log" % str(i).zfill(5)
+        return "logs" + os.sep + label+"-%s" % str(i).zfill(5) + extension
+
+    key = (label, extension)
+    if key not in log_counters:
+        os.makedirs(folder, exist_ok=True)
+        log_counters[key] = get_highest_log_number(folder, label, extension) + 1
+
+    while True:
+        path = get_path(log_counters[key])
+        log_counters[key] += 1
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return path
+        except FileExistsError:
+            pass
+        except FileNotFoundError:
+            os.makedirs(folder, exist_ok=True)
+            log_counters[key] -= 1
 
-    i = 1
-    while os.path.isfile(get_path(i)):
-        i += 1
-    return get_path(i)
+def get_highest_log_number(folder, label, extension):
+    "Returns the highest number used by an existing log for this label, or 0 if there are none."
+    import re
+    pattern = re.compile(re.escape(label) + "-(\\d+)" + re.escape(extension) + "$")
+    highest = 0
+    for filename in os.listdir(folder):
+        match = pattern.match(filename)
+        if match:
+            highest = max(highest, int(match.group(1)))
+    return highest
 
 
 def get_matching_paths_recursively(rootdir, extension, verbose=0):
@@ -42,8 +70,14 @@ def lengths_match_ships(lengths,ships):
 def is_ship_in_world(ship):
     """Returns true if every position occupied by this ship is inside the world.
     Also returns false if ship is invalid."""
+    placement = get_placement(ship)
+    if placement:
+        return placement.is_in_world
     if not is_ship_valid(ship):
         return False
+    if is_length_indexed(ship[0]):
+        "Every placement of this length that fits on the board is indexed, so this one does not."
+        return False
     for x,y in get_ship_coordinates(ship):
         "Corner One"
         if (x<2 and y<1) or (x<1 and y<2):
@@ -105,6 +139,14 @@ def get_ship_lengths_message(lengths,ships):
     return ""
 
 def do_ships_overlap(ships):
+    placements = [get_placement(ship) for ship in ships]
+    if all(placements):
+        used_mask = 0
+        for placement in placements:
+            if placement.mask & used_mask:
+                return True
+            used_mask |= placement.mask
+        return False
     return bool(get_overlap_ships_message(ships))
 
 def get_overlap_ships_message(ships):
@@ -119,28 +161,106 @@ def get_overlap_ships_message(ships):
     return ""
 
 def do_ships_touch(ships):
+    placements = [get_placement(ship) for ship in ships]
+    if all(placements):
+        "Overlapping ships always touch too, since every indexed ship is at least two cells long."
+        used_mask = 0
+        for placement in placements:
+            if (placement.mask | placement.neighbour_mask) & used_mask:
+                return True
+            used_mask |= placement.mask
+        return False
     return bool(get_touching_ships_message(ships))
     
 def get_touching_ships_message(ships):
     "Returns an empty string if ships do not touch. If they do, returned string describes the overlap."
-    used_coords=set()
-    count = 0
-    for ship in ships:
-        count += 1
-        ship_id = count
+    "The grid maps each used cell to the id of the first ship on it."
+    grid={}
+    for ship_id, ship in enumerate(ships, 1):
         for x, y in get_ship_coordinates(ship):
-            coord = (x,y,ship_id)
-            if any([True for t in used_coords if t[0]==x+1 and t[1]==y and t[2]!=ship_id]):
-                return "touching ships detected. (x,y)="+str((x,y))+" ship="+str(ship)
-            if any([True for t in used_coords if t[0]==x-1 and t[1]==y and t[2]!=ship_id]):
-                return "touching ships detected. (x,y)="+str((x,y))+" ship="+str(ship)
-            if any([True for t in used_coords if t[0]==x and t[1]==y+1 and t[2]!=ship_id]):
-                return "touching ships detected. (x,y)="+str((x,y))+" ship="+str(ship)
-            if any([True for t in used_coords if t[0]==x and t[1]==y-1 and t[2]!=ship_id]):
-                return "touching ships detected. (x,y)="+str((x,y))+" ship="+str(ship)
-                
-            used_coords.add(coord)
+            for neighbour in ((x+1,y),(x-1,y),(x,y+1),(x,y-1)):
+                if grid.get(neighbour,ship_id)!=ship_id:
+                    return "touching ships detected. (x,y)="+str((x,y))+" ship="+str(ship)
+            grid.setdefault((x,y),ship_id)
     return ""
+
+
+class FleetError:
+    "Why a fleet is invalid: one of the SHIPS_ERROR reasons, and the ship and cell it was found at, if known."
+    def __init__(self, reason, ship=None, cell=None):
+        self.reason = reason
+        self.ship = ship
+        self.cell = cell
+
+    def __str__(self):
+        text = self.reason
+        if self.ship is not None:
+            text += " " + str(self.ship)
+        if self.cell is not None:
+            text += " at (x,y)=" + str(self.cell)
+        return text
+
+
+def get_mask_cell(mask, height):
+    "Returns the (x,y) of the lowest cell set in a mask with cell (x,y) at bit x*height+y."
+    return divmod((mask & -mask).bit_length() - 1, height)
+
+
+def check_fleet(ships, width=BOARD.WIDTH, height=BOARD.HEIGHT, lengths=BOARD.SHIP_LENGTHS, check_touching=True,
+                occupied_mask=0):
+    """Checks a fleet in one pass, marking each ship in an occupancy bitmask with cell (x,y) at bit x*height+y.
+    Checks the fleet's type and ship count, then each ship's data, length, bounds, overlap and, if check_touching,
+    whether it shares an edge with another ship. If lengths is None, any count and lengths are allowed.
+    occupied_mask has the cells of ships placed before. Bounds are the width by height rectangle,
+    the cut off corners that is_ship_in_world rejects are not checked.
+    Returns (error, ship_cells). error is a FleetError, or None if the fleet is valid.
+    ship_cells is then a list with the (coordinates, mask) of each ship, ready to place."""
+    if not ships or type(ships) not in (tuple, list):
+        return FleetError(SHIPS_ERROR.BASIC_TYPE), None
+    if lengths is not None:
+        if len(ships) != len(lengths):
+            return FleetError(SHIPS_ERROR.COUNT), None
+        unused_lengths = list(lengths)
+
+    board_sized = width == BOARD.WIDTH and height == BOARD.HEIGHT
+    ship_cells = []
+    for ship in ships:
+        "Only valid ship data has a placement, so is_ship_valid is left for ships without one."
+        placement = get_placement(ship) if board_sized else None
+        if not placement and not is_ship_valid(ship):
+            return FleetError(SHIPS_ERROR.INVALID, ship), None
+        ship_length = ship[0]
+        if lengths is not None:
+            if ship_length not in unused_lengths:
+                reason = SHIPS_ERROR.DUPLICATE_LENGTH if ship_length in lengths else SHIPS_ERROR.LENGTH
+                return FleetError(reason, ship), None
+            unused_lengths.remove(ship_length)
+
+        if placement:
+            coordinates = placement.coordinates
+            mask = placement.mask
+            neighbour_mask = placement.neighbour_mask
+        else:
+            ship_length, x, y, rotation = ship
+            if not ship_length or x + (1 if rotation else ship_length) > width or y + (ship_length if rotation else 1) > height:
+                return FleetError(SHIPS_ERROR.OUTSIDE, ship), None
+            coordinates = get_ship_coordinates(ship)
+            mask = 0
+            neighbour_mask = 0
+            for x, y in coordinates:
+                mask |= 1 << (x * height + y)
+                for x2, y2 in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                    if 0 <= x2 < width and 0 <= y2 < height:
+                        neighbour_mask |= 1 << (x2 * height + y2)
+            neighbour_mask &= ~mask
+
+        if mask & occupied_mask:
+            return FleetError(SHIPS_ERROR.OVERLAPPING, ship, get_mask_cell(mask & occupied_mask, height)), None
+        if check_touching and neighbour_mask & occupied_mask:
+            return FleetError(SHIPS_ERROR.TOUCHING, ship, get_mask_cell(neighbour_mask & occupied_mask, height)), None
+        occupied_mask |= mask
+        ship_cells.append((coordinates, mask))
+    return None, ship_cells
     
 def get_ship_coordinates(ship):
     """Given ship parameters, returns a list of coordinates this ship will occupy. Example:
@@ -157,7 +277,32 @@ def get_ship_coordinates(ship):
     return [[x + x_vector * i, y + y_vector * i] for i in range(ship_length)]
 
 
-def get_versus_log_path(bot1,bot2):
+def get_game_seed(master_seed, game_index):
+    """Returns the seed for game number game_index of a run started from master_seed.
+    The same pair always gives the same seed, so any game can be replayed on its own."""
+    return random.Random("%s-%s" % (master_seed, game_index)).getrandbits(64)
+
+def get_sub_seed(game_seed, name):
+    """Returns a seed for one use within a game, like "first" for picking the first mover or "player1" for a bot.
+    Each name gives an unrelated stream, so a bot's draws tell it nothing about the engine's."""
+    return random.Random("%s-%s" % (game_seed, name)).getrandbits(64)
+
+def set_game_seed(bot, player, game_seed):
+    "Gives the bot its own seed for this game as bot.game_seed, if the bot allows the attribute."
+    try:
+        bot.game_seed = get_sub_seed(game_seed, "player%s" % (player + 1))
+    except:
+        pass
+
+def get_ship_name(bot):
+    try:
+        return bot.ship_name
+    except:
+        return "Unknown"
+
+def get_versus_label(bot1,bot2):
+    "Returns a file name safe label like 'ssrandom-versus-sssequential'."
+    import string
     def safe_name(text):
         if not text or len(text)==0:
             return "unknown"
@@ -167,56 +312,178 @@ def get_versus_log_path(bot1,bot2):
     
     name1=safe_name(bot1.ship_name)
     name2=safe_name(bot2.ship_name)
-        
-    label=name1+"-versus-"+name2
-    return get_next_log_path(label=label)
+    return name1+"-versus-"+name2
 
-def get_bot_from_path(path, verbose=False):
+def get_versus_log_path(bot1,bot2):
+    return get_next_log_path(label=get_versus_label(bot1,bot2))
+
+"Bot script modules imported by this process, keyed by absolute path, with the file modification time they were imported at."
+bot_modules = {}
+
+def get_bot_module(path):
+    """Imports the bot script at path and returns the module, or None if it can't be imported.
+    Each script runs once per process, and again only if the file has changed since."""
+    key = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    if key in bot_modules and bot_modules[key][0] == mtime:
+        return bot_modules[key][1]
+    
+    import importlib.util
     spec = importlib.util.spec_from_file_location("bot", path)
     if not spec:
         return None
-    module = spec.loader.load_module()
+    module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(module)
+    bot_modules[key] = (mtime, module)
+    return module
+
+def get_bot_from_path(path, verbose=False):
+    "Returns a new bot from the script at path. Bots from the same script share its module."
+    module = get_bot_module(path)
+    if not module:
+        return None
     return module.BattleshipBot()
 
-def get_bot_paths(folder,verbose=True):
+def get_bot(path, sandbox_options=None):
+    "Loads the bot at path in this process, or in a SandboxBot if sandbox_options is a dictionary of its options."
+    if sandbox_options is not None:
+        from sandbox import SandboxBot
+        return SandboxBot(path, **sandbox_options)
+    return get_bot_from_path(path)
+
+def get_bot_paths(folder,verbose=True,loader=None):
     paths=[]
     for filename in os.listdir(folder):
         if not filename.endswith(".py"):
             continue
         path=folder+os.sep+filename
-        if is_valid_script(path,verbose=verbose):
+        if is_valid_script(path,verbose=verbose,loader=loader):
             paths.append(path)
         else:
             print("")
     return paths
 
-def is_valid_script(path, verbose=False):
-    "Is this bot script path valid and probably safe?"
+"""Bump this when validation rules change, so scripts validated under the old rules are checked again.
+The Python version is part of the key too, since a script that imports on one version may not on another."""
+VALIDATION_CACHE_VERSION = "2-python%s.%s" % sys.version_info[:2]
+VALIDATION_CACHE_PATH = os.path.join(CACHE_FOLDER, "validation.json")
+
+"""Keys of scripts known to be valid, loaded from VALIDATION_CACHE_PATH on first use.
+A key is the loader's cache kind and the script's content hash, like 'process:3fa2...'."""
+_valid_script_hashes = None
+
+"Modules bot scripts may import."
+IMPORTABLE_MODULES = ("random", "constants", "utilities", "copy", "ai_tools")
+
+_validation_cache_version = None
+
+def get_validation_cache_version():
+    """Returns VALIDATION_CACHE_VERSION with a hash of this game's modules that bots can import, and placements,
+    which utilities imports. A script that imported fine may not once they change, so then every script is checked again."""
+    global _validation_cache_version
+    if _validation_cache_version is None:
+        folder = os.path.dirname(os.path.abspath(__file__))
+        _validation_cache_version = "%s-%s" % (VALIDATION_CACHE_VERSION, get_modules_hash(folder))
+    return _validation_cache_version
+
+def get_modules_hash(folder):
+    "Returns a short hash of the modules in folder that bots can import, directly or through utilities."
+    import hashlib
+    digest = hashlib.sha256()
+    for name in IMPORTABLE_MODULES + ("placements",):
+        path = os.path.join(folder, name + ".py")
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                digest.update(name.encode("utf-8") + b"\0" + f.read())
+    return digest.hexdigest()[:16]
+
+def get_valid_script_hashes():
+    global _valid_script_hashes
+    if _valid_script_hashes is None:
+        import json
+        _valid_script_hashes = set()
+        try:
+            with open(VALIDATION_CACHE_PATH, "r") as f:
+                data = json.load(f)
+            if data.get("version") == get_validation_cache_version():
+                _valid_script_hashes = set(data["valid"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+    return _valid_script_hashes
+
+def write_validation_cache():
+    """Writes the known script keys to the validation cache file. The file is replaced in one step,
+    so a run reading it never sees half a file."""
+    import json
+    try:
+        os.makedirs(os.path.dirname(VALIDATION_CACHE_PATH) or ".", exist_ok=True)
+        temporary_path = "%s.%s.tmp" % (VALIDATION_CACHE_PATH, os.getpid())
+        with open(temporary_path, "w") as f:
+            json.dump({"version": get_validation_cache_version(), "valid": sorted(get_valid_script_hashes())}, f)
+        os.replace(temporary_path, VALIDATION_CACHE_PATH)
+    except OSError:
+        pass
+
+def remember_valid_script(key):
+    get_valid_script_hashes().add(key)
+    write_validation_cache()
+
+def forget_valid_script(path, loader=None):
+    "Removes a script from the validation cache, for a script that passed but then failed to load."
+    key = get_validation_cache_key(path, loader)
+    if key in get_valid_script_hashes():
+        get_valid_script_hashes().discard(key)
+        write_validation_cache()
+
+def get_validation_cache_key(path, loader=None):
+    "Returns the script's validation cache key for this loader, or None if the loader has no cache_kind."
+    cache_kind = "process" if loader is None else getattr(loader, "cache_kind", None)
+    return cache_kind and "%s:%s" % (cache_kind, get_script_hash(path))
+
+def get_script_hash(path):
+    import hashlib
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+"Attributes and functions every bot must have."
+BOT_ATTRIBUTES = ("ship_name", "commander_name", "get_move", "get_setup")
+
+def is_valid_script(path, verbose=False, loader=None):
+    """Is this bot script path valid and probably safe?
+    loader(path) builds the bot to check, get_bot_from_path if None. A sandbox loader keeps the script out of this process.
+    Scripts that pass are remembered by content hash and loader.cache_kind, so an unchanged script is not checked
+    again in later runs with the same kind of loader. Loaders without a cache_kind are never cached.
+    Failures are always checked again, to print why they failed."""
     if not os.path.isfile(path) or not path or not path.endswith(".py"):
         if verbose:
             print("Invalid script. Not a python script file: '%s'" % path)
         return False
 
+    cache_key = get_validation_cache_key(path, loader)
+    if cache_key and cache_key in get_valid_script_hashes():
+        return True
+
     if not is_script_safe(path, verbose=verbose):
         if verbose:
             print("Invalid script. Unsafe script: '%s'" % path)
         return False
 
     try:
-        bot = get_bot_from_path(path, verbose=verbose)
+        bot = loader(path) if loader else get_bot_from_path(path, verbose=verbose)
     except:
         if verbose:
             print("Script failed to import: '%s'"%path)
+            import traceback
             traceback.print_exc(limit=2, file=sys.stdout)
         return False
 
-    required_attributes = ("ship_name", "commander_name", "get_move", "get_setup")
-    for a in required_attributes:
+    for a in BOT_ATTRIBUTES:
         if a not in dir(bot):
             if verbose:
                 print("Invalid script. Missing attribute or function: '%s'" % a)
             return False
+    if cache_key:
+        remember_valid_script(cache_key)
     return True
 
 def is_import_line_safe(line):
@@ -225,7 +492,7 @@ def is_import_line_safe(line):
     if "import " not in line:
         return True
     
-    for white in ("random","constants","utilities","copy","ai_tools"):
+    for white in IMPORTABLE_MODULES:
         for a in ("from %s import ","import %s"):
             if a%white in line:
                 return True
@@ -234,6 +501,7 @@ def is_import_line_safe(line):
 
 def is_script_safe(path, verbose=False):
     "Performs basic but holy security checks on the script, verify that it probably can't do too many evil things."
+    import re
     with open(path, "r") as f:
         data = f.read()
     lines = data.split("\n")
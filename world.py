@@ -1,5 +1,3 @@
-import copy
-
 from constants import *
 from utilities import *
 
@@ -10,122 +8,139 @@ class World:
         self.height = height
         self.ship_counter = 0
 
+        "Unhit cell count for each ship id, and for the whole navy."
+        self.ship_health = {}
+        self.remaining_cells = 0
+
+        "Bitmask of every ship cell, with cell (x,y) at bit x*height+y, and why the last rejected ships were invalid."
+        self.ships_mask = 0
+        self.ships_error = None
+
         self.shots = [[0 for i in range(height)] for j in range(width)]
         self.ships = [[0 for i in range(height)] for j in range(width)]
         
         "A set of all shots, if any, that was the last shot on a ship that sunk it."
         self.sunk_shots = set()
 
+        self.init_views()
+
+    def init_views(self):
+        """Sets up the cached, read-only hits and shots views handed to bots.
+        Only columns listed in dirty_columns are rebuilt when the views are next read."""
+        self.hits_columns = [None] * self.width
+        self.shots_columns = [None] * self.width
+        self.hits_view = None
+        self.shots_view = None
+        self.dirty_columns = set(range(self.width))
+
+    def refresh_views(self):
+        "Rebuilds the cached views for columns that changed since they were last read."
+        if not self.dirty_columns:
+            return
+        for x in self.dirty_columns:
+            self.hits_columns[x] = self.get_hits_column(x)
+            self.shots_columns[x] = self.get_shots_column(x)
+        self.dirty_columns.clear()
+        self.hits_view = tuple(self.hits_columns)
+        self.shots_view = tuple(self.shots_columns)
+
+    def get_shots_column(self, x):
+        return tuple(self.shots[x])
+
+    def get_hits_column(self, x):
+        ships = self.ships[x]
+        shots = self.shots[x]
+        column = [1 if ships[y] and shots[y] else 0 for y in range(self.height)]
+        for sunk_x, sunk_y in self.sunk_shots:
+            if sunk_x == x:
+                column[sunk_y] = 2
+        return tuple(column)
+
     def get_tuple_array(self, array):
         "Takes a 2D array and converts it, and its inner items to tuples instead of lists."
         return tuple([tuple([a for a in column]) for column in array])
 
     def get_shots(self):
         "Returns a tuple array where 0 has never been shot at, 1 has."
-        return self.get_tuple_array(self.shots)
+        self.refresh_views()
+        return self.shots_view
 
     def get_ships(self):
         return self.get_tuple_array(self.ships)
-        
 
     def get_hits(self):
-        """Returns a 2D array.
+        """Returns a tuple array.
         0 means no was hit in this cell.
         1 means a ship has been hit here.
         2 means a ship has been hit here, and it sunk the ship."""
-        hits = copy.deepcopy(self.ships)
-        for i in range(self.width):
-            for j in range(self.height):
-                if self.ships[i][j]:
-                    hits[i][j]=1 if self.shots[i][j] else 0
-        for sunk_shot in self.sunk_shots:
-            hits[sunk_shot[0]][sunk_shot[1]]=2
-        return hits
-    
+        self.refresh_views()
+        return self.hits_view
 
     def shoot(self, x, y):
         "Shoots this cell."
         new_shot=not self.shots[x][y]
         self.shots[x][y] = 1
-        if new_shot and self.is_ship_sunk(x,y):
-            self.sunk_shots.add((x,y))        
-        
+        self.dirty_columns.add(x)
+        ship_id=self.ships[x][y]
+        if new_shot and ship_id:
+            self.ship_health[ship_id] -= 1
+            self.remaining_cells -= 1
+            if not self.ship_health[ship_id]:
+                self.sunk_shots.add((x,y))
+
     def is_ship_sunk(self,x,y):
         "Returns true if there is a ship at this position and it is completely sunk."
         ship_id=self.ships[x][y]
         if not ship_id:
             return False
-        
-        for i in range(self.width):
-            for j in range(self.height):
-                if self.ships[i][j]==ship_id and not self.shots[i][j]:
-                    return False
-        return True        
+        return not self.ship_health[ship_id]
 
     def is_navy_alive(self):
         "Returns true if at least one ship cell is not hit yet."
-        for i in range(self.width):
-            for j in range(self.height):
-                if self.ships[i][j] and not self.shots[i][j]:
-                    return True
-        return False
+        return self.remaining_cells > 0
 
     def set_ships(self, ships):
-        "Returns true if no errors were encountered."
-        for counter, ship in enumerate(ships):
-        # for ship in ships:
-            if not self.set_ship(ship):
-                return False
-            
-        if len(ships) != BOARD.SHIP_COUNT:
-            return False
-        
-        lengths=[ship[0] for ship in ships]
-        unused_lengths=list(copy.copy(BOARD.SHIP_LENGTHS))
-        for i in lengths:
-            if i not in unused_lengths:
-                return False
-            unused_lengths.remove(i)
-        
-        return True
+        """Places the whole fleet, if it has the right ship count and lengths, fits in the world and no ships overlap or touch.
+        Otherwise nothing is placed and ships_error says why. Returns true if the fleet was placed."""
+        return self.place_ships(ships, BOARD.SHIP_LENGTHS)
 
     def set_ship(self, ship):
-        """Returns True if no errors were encountered."""
-        if not is_ship_valid(ship):
+        """Places one ship of any length, if it fits in the world without overlapping or touching another ship.
+        Returns True if it was placed."""
+        return self.place_ships((ship,), None)
+
+    def place_ships(self, ships, lengths):
+        "Checks ships with check_fleet against the ships already placed, and only places them if they are all valid."
+        self.ships_error, ship_cells = check_fleet(ships, self.width, self.height, lengths, occupied_mask=self.ships_mask)
+        if self.ships_error:
             return False
+        for coordinates, mask in ship_cells:
+            self.ship_counter += 1
+            self.add_ship(self.ship_counter, coordinates, mask)
+        return True
 
-        self.ship_counter += 1
-        ship_id = self.ship_counter
-        for x, y in get_ship_coordinates(ship):
-            if self.ships[x][y]:
-                return False
-            if self.is_ship_touching(x, y, ship_id):
-                return False
+    def add_ship(self, ship_id, coordinates, mask):
+        self.ships_mask |= mask
+        self.ship_health[ship_id] = 0
+        for x, y in coordinates:
             self.ships[x][y] = ship_id
-            
-        return True
+            self.dirty_columns.add(x)
+            if not self.shots[x][y]:
+                self.ship_health[ship_id] += 1
+                self.remaining_cells += 1
 
-    def is_ship_touching(self, x, y, ship_id):
-        "Returns True if any coordinate on the ship shares an edge with another."
-        if x < self.width-1:
-            if self.ships[x+1][y] and self.ships[x+1][y] != ship_id:
-                return True
-        if x > 0:
-            if self.ships[x-1][y] and self.ships[x-1][y] != ship_id:
-                return True
-        if y < self.height-1:
-            if self.ships[x][y+1] and self.ships[x][y+1] != ship_id:
-                return True
-        if y > 0:
-            if self.ships[x][y-1] and self.ships[x][y-1] != ship_id:
-                return True
-        
-        return False
-        
     def is_in_bounds(self, x, y):
         return x >= 0 and y >= 0 and x < self.width and y < self.height
 
+    def get_ship_placement(self, ship):
+        "Returns the indexed Placement for this ship, or None if there isn't one or this world is not BOARD sized."
+        if self.width != BOARD.WIDTH or self.height != BOARD.HEIGHT:
+            return None
+        return get_placement(ship)
+
     def is_ship_in_bounds(self, ship):
+        if self.get_ship_placement(ship):
+            return True
         ship_length, x, y, rotation = ship
         coordinates=get_ship_coordinates(ship)
         if not coordinates:
@@ -140,27 +155,10 @@ class World:
         return not self._get_invalid_ships_message(ships)
 
     def _get_invalid_ships_message(self, ships):
-        "If ships is invalid, returns a message describing how. Returns an empty string if ships is valid."
-
-        if not ships or type(ships) not in (tuple, list):
-            return SHIPS_ERROR.BASIC_TYPE
-        
-        if len(ships) != BOARD.SHIP_COUNT:
-            return SHIPS_ERROR.COUNT
-
-        for ship in ships:
-            if not self.is_ship_in_bounds(ship):
-                return SHIPS_ERROR.OUTSIDE+" "+str(ship)
-            if not is_ship_valid(ship):
-                return SHIPS_ERROR.INVALID+" "+str(ship)
-
-        if (lengths_match_ships(BOARD.SHIP_LENGTHS,ships)):
-            return get_ship_lengths_message(BOARD.SHIP_LENGTHS,ships)
-        
-        if do_ships_overlap(ships):
-            return get_overlap_ships_message(ships)
-        
-        return ""
+        """If ships is invalid, returns a message describing how. Returns an empty string if ships is valid.
+        Touching ships are allowed here, unlike in set_ships."""
+        error, ship_cells = check_fleet(ships, self.width, self.height, check_touching=False)
+        return str(error) if error else ""
 
     def show(self, label, other_world=None):
         print(label)
@@ -171,6 +169,8 @@ class World:
     def to_string(self, other_world=None):
         "Returns a string that can be printed to display the state of the world."
         hits = self.get_hits()
+        shots = self.get_shots()
+        ships = self.get_ships()
         spacing = "        "
         lines = []
         
@@ -181,9 +181,9 @@ class World:
                     lines[-1] += "  "
                 elif hits[i][j]:
                     lines[-1] += " X"
-                elif self.shots[i][j]:
+                elif shots[i][j]:
                     lines[-1] += " O"
-                elif self.ships[i][j]:
+                elif ships[i][j]:
                     lines[-1] += " T"
                 else:
                     lines[-1] += " ~"